@@ -0,0 +1,29 @@
+"""Add is_admin to users
+
+Revision ID: 3f6d2a9c1b7e
+Revises: ba52603f3282
+Create Date: 2026-10-19 10:12:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d2a9c1b7e'
+down_revision: Union[str, None] = 'ba52603f3282'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'is_admin')
@@ -0,0 +1,77 @@
+"""Add knowledge_bases, documents and chunks
+
+Revision ID: 8c41e5f0a2d3
+Revises: 3f6d2a9c1b7e
+Create Date: 2026-10-19 11:02:47.581920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41e5f0a2d3'
+down_revision: Union[str, None] = '3f6d2a9c1b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'knowledge_bases',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_knowledge_bases_owner_id_created_at', 'knowledge_bases', ['owner_id', 'created_at', 'id'])
+
+    op.create_table(
+        'documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('knowledge_base_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), server_default='pending', nullable=False),
+        sa.Column('chunk_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['knowledge_base_id'], ['knowledge_bases.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_documents_owner_id_created_at', 'documents', ['owner_id', 'created_at', 'id'])
+    op.create_index('ix_documents_knowledge_base_id_created_at', 'documents', ['knowledge_base_id', 'created_at', 'id'])
+
+    op.create_table(
+        'chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('index', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('token_count', sa.Integer(), nullable=False),
+        sa.Column('page_start', sa.Integer(), nullable=True),
+        sa.Column('page_end', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_chunks_owner_id_created_at', 'chunks', ['owner_id', 'created_at', 'id'])
+    op.create_index('ix_chunks_document_id_index', 'chunks', ['document_id', 'index'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunks_document_id_index', table_name='chunks')
+    op.drop_index('ix_chunks_owner_id_created_at', table_name='chunks')
+    op.drop_table('chunks')
+    op.drop_index('ix_documents_knowledge_base_id_created_at', table_name='documents')
+    op.drop_index('ix_documents_owner_id_created_at', table_name='documents')
+    op.drop_table('documents')
+    op.drop_index('ix_knowledge_bases_owner_id_created_at', table_name='knowledge_bases')
+    op.drop_table('knowledge_bases')
@@ -0,0 +1,296 @@
+"""
+API Load and Latency Benchmark
+
+Drives the real FastAPI app in-process (ASGI transport) and over a real
+socket (uvicorn on localhost), with local stand-ins for the backing
+services:
+    Postgres -> a temporary SQLite database
+    Redis    -> fakeredis
+    Celery   -> the in-memory broker (tasks are published, not executed)
+
+Reports throughput and p50/p95/p99 latency per endpoint and compares them
+with a stored baseline. Exits non-zero if any endpoint regressed by more
+than the threshold.
+
+Usage (from the repo root):
+    python benchmarks/bench_api.py                      # compare to baseline
+    python benchmarks/bench_api.py --update-baseline    # record a new one
+    python benchmarks/bench_api.py --mode socket --requests 500
+
+Baselines are machine-specific, so benchmarks/baseline.json is not
+committed: record it with --update-baseline on the machine that runs the
+check. benchmarks/baseline.example.json shows the format.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+sys.path.insert(0, str(ROOT / "src"))
+
+# --- Local stand-ins, configured before any app module is imported ---
+_tmpdir = tempfile.mkdtemp(prefix="vectorvault-bench-")
+os.environ.update({
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "SECRET_KEY": "bench-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "DATABASE_URL": f"sqlite:///{_tmpdir}/bench.db",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "DATA_DIR": _tmpdir,
+    # Keep admission control in the path, but never throttle the benchmark
+    "RATE_LIMIT_PER_SECOND": "1000000",
+    "RATE_LIMIT_BURST": "1000000",
+    "MAX_CONCURRENT_PER_USER": "100000",
+    "SHED_MAX_IN_FLIGHT": "100000",
+})
+
+import fakeredis  # noqa: E402
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fakeredis import aioredis  # noqa: E402
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import redis_client  # noqa: E402
+    from database import Base, engine  # noqa: E402
+    from main import app  # noqa: E402
+
+_server = fakeredis.FakeServer()
+redis_client._redis = fakeredis.FakeRedis(server=_server)
+redis_client.get_async_redis = lambda: aioredis.FakeRedis(server=_server)
+Base.metadata.create_all(engine)
+logging.getLogger().setLevel(logging.WARNING)
+for name in ("monitoring", "httpx", "kombu", "uvicorn.access"):
+    logging.getLogger(name).setLevel(logging.WARNING)
+
+PASSWORD = "bench-password-123"
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    auth: bool = False
+    # Builds per-request kwargs for httpx (json=..., data=...)
+    payload: Callable[[int], dict] = lambda i: {}
+    # Fraction of --requests to run (password hashing is deliberately slow)
+    weight: float = 1.0
+    expected: tuple = (200,)
+
+
+@dataclass
+class Result:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    wall: float = 0.0
+
+    def summary(self) -> dict:
+        lat = sorted(self.latencies)
+        q = statistics.quantiles(lat, n=100, method="inclusive") if len(lat) > 1 else lat * 99
+        return {
+            "requests": len(lat),
+            "errors": self.errors,
+            "rps": round(len(lat) / self.wall, 1) if self.wall else 0.0,
+            "p50_ms": round(q[49] * 1000, 2),
+            "p95_ms": round(q[94] * 1000, 2),
+            "p99_ms": round(q[98] * 1000, 2),
+        }
+
+
+def scenarios(run_id: str, username: str) -> list[Scenario]:
+    return [
+        Scenario("health", "GET", "/health"),
+        Scenario("metrics", "GET", "/metrics"),
+        Scenario("users_me", "GET", "/users/me", auth=True),
+        Scenario(
+            "token", "POST", "/token",
+            payload=lambda i: {"data": {"username": username, "password": PASSWORD}},
+            weight=0.1,
+        ),
+        Scenario(
+            "register", "POST", "/users/register",
+            payload=lambda i: {"json": {"username": f"bench-{run_id}-{i}", "password": PASSWORD}},
+            weight=0.1,
+            expected=(201,),
+        ),
+        Scenario("test_task", "POST", "/test-task"),
+        Scenario("snapshot_export", "POST", "/snapshots", auth=True, expected=(202,)),
+        Scenario("snapshot_list", "GET", "/snapshots", auth=True),
+    ]
+
+
+async def run_scenario(client, scenario, headers, total, concurrency) -> Result:
+    result = Result()
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            kwargs = scenario.payload(i)
+            start = time.perf_counter()
+            response = await client.request(
+                scenario.method, scenario.path,
+                headers=headers if scenario.auth else None, **kwargs
+            )
+            result.latencies.append(time.perf_counter() - start)
+            if response.status_code not in scenario.expected:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.wall = time.perf_counter() - start
+    return result
+
+
+async def run_suite(client, requests, concurrency, repeat) -> dict:
+    # Rebuild the middleware stack so per-loop clients (async Redis) are
+    # created on this run's event loop
+    app.middleware_stack = None
+    run_id = uuid.uuid4().hex[:8]
+    username = f"bench-{run_id}"
+    await client.post("/users/register", json={"username": username, "password": PASSWORD})
+    token = (await client.post("/token", data={"username": username, "password": PASSWORD})).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    results = {}
+    for scenario in scenarios(run_id, username):
+        total = max(concurrency, int(requests * scenario.weight))
+        runs = []
+        for attempt in range(repeat):
+            if attempt and scenario.name == "register":
+                scenario.payload = _fresh_usernames(run_id, attempt)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = await run_scenario(client, scenario, headers, total, concurrency)
+            runs.append(result.summary())
+        # Keep the median run to damp scheduler noise
+        results[scenario.name] = sorted(runs, key=lambda r: r["p95_ms"])[len(runs) // 2]
+    return results
+
+
+def _fresh_usernames(run_id: str, attempt: int):
+    return lambda i: {"json": {"username": f"bench-{run_id}-{attempt}-{i}", "password": PASSWORD}}
+
+
+async def run_inprocess(requests, concurrency, repeat) -> dict:
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run_suite(client, requests, concurrency, repeat)
+
+
+async def run_socket(requests, concurrency, repeat) -> dict:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread.start()
+        while not server.started:
+            await asyncio.sleep(0.05)
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            return await run_suite(client, requests, concurrency, repeat)
+    finally:
+        server.should_exit = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread.join(timeout=10)
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list[str]:
+    """
+    Return a list of regressions beyond `threshold` (a fraction). Latency
+    increases smaller than `min_delta_ms` are ignored as noise.
+    """
+    failures = []
+    for mode, endpoints in results.items():
+        for name, current in endpoints.items():
+            base = baseline.get(mode, {}).get(name)
+            if not base:
+                continue
+            if current["errors"]:
+                failures.append(f"{mode}/{name}: {current['errors']} unexpected status codes")
+            if (
+                current["p95_ms"] > base["p95_ms"] * (1 + threshold)
+                and current["p95_ms"] - base["p95_ms"] > min_delta_ms
+            ):
+                failures.append(f"{mode}/{name}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+            if current["rps"] < base["rps"] * (1 - threshold):
+                failures.append(f"{mode}/{name}: {current['rps']} req/s < baseline {base['rps']} req/s")
+    return failures
+
+
+def print_table(results: dict, baseline: dict):
+    print(f"{'mode/endpoint':<28} {'req':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'base p95':>9}")
+    for mode, endpoints in results.items():
+        for name, r in endpoints.items():
+            base = baseline.get(mode, {}).get(name, {}).get("p95_ms", "-")
+            print(
+                f"{mode + '/' + name:<28} {r['requests']:>6} {r['errors']:>4} {r['rps']:>9} "
+                f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {base:>9}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["inprocess", "socket", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per endpoint; the median run is reported")
+    parser.add_argument("--threshold", type=float, default=0.35,
+                        help="allowed regression vs. baseline (0.35 = 35%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0,
+                        help="ignore p95 increases smaller than this")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    modes = ["inprocess", "socket"] if args.mode == "both" else [args.mode]
+    runners = {"inprocess": run_inprocess, "socket": run_socket}
+    results = {mode: asyncio.run(runners[mode](args.requests, args.concurrency, args.repeat)) for mode in modes}
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    print_table(results, baseline)
+
+    if args.update_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not baseline:
+        print("\nNo baseline recorded; run with --update-baseline first.")
+        return
+    failures = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if failures:
+        print("\nFAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\nPASS (within {args.threshold:.0%} of baseline)")
+
+
+if __name__ == "__main__":
+    main()
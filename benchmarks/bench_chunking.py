@@ -0,0 +1,89 @@
+"""
+Chunking Throughput Benchmark
+
+Streams a large synthetic document through the chunker and reports
+throughput in MB/s and the peak RSS of the process.
+
+Usage (from the repo root):
+    python benchmarks/bench_chunking.py --size-mb 200
+"""
+
+import argparse
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from chunking import TokenCounter, iter_chunks  # noqa: E402
+
+
+def synthetic_pages(size_mb: int, page_kb: int, seed: int = 0):
+    """Lazily generate pages of random words totalling `size_mb` megabytes."""
+    rng = random.Random(seed)
+    vocab = [
+        "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 12)))
+        for _ in range(5000)
+    ]
+    words_per_page = page_kb * 1024 // 8
+    # A small pool of distinct pages keeps generation out of the measurement
+    pool = [" ".join(rng.choices(vocab, k=words_per_page)) for _ in range(64)]
+    remaining = size_mb * 1024 * 1024
+    i = 0
+    while remaining > 0:
+        page = pool[i % len(pool)][:remaining]
+        remaining -= len(page)
+        i += 1
+        yield page
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--page-kb", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--overlap-tokens", type=int, default=64)
+    parser.add_argument("--estimate-only", action="store_true",
+                        help="skip the exact tokenizer even if tiktoken is installed")
+    args = parser.parse_args()
+
+    counter = TokenCounter(exact=not args.estimate_only)
+    rss_before = peak_rss_mb()
+
+    processed = 0
+    chunks = 0
+
+    def counted_pages():
+        nonlocal processed
+        for page in synthetic_pages(args.size_mb, args.page_kb):
+            processed += len(page)
+            yield page
+
+    start = time.perf_counter()
+    for _ in iter_chunks(
+        counted_pages(),
+        max_tokens=args.max_tokens,
+        overlap_tokens=args.overlap_tokens,
+        counter=counter,
+    ):
+        chunks += 1
+    elapsed = time.perf_counter() - start
+
+    mb = processed / (1024 * 1024)
+    print(f"tokenizer:      {'exact' if counter.has_exact else 'estimate'}")
+    print(f"document size:  {mb:.1f} MB")
+    print(f"chunks:         {chunks}")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"throughput:     {mb / elapsed:.2f} MB/s")
+    print(f"peak RSS:       {peak_rss_mb():.1f} MB (baseline {rss_before:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Response Serialization Benchmark
+
+Compares the default FastAPI path (response_model validation +
+jsonable_encoder + json) against orjson-backed responses for large search
+payloads, reporting output bytes/sec and CPU time per response.
+
+Usage (from the repo root):
+    python benchmarks/bench_serialization.py --results 100 --dim 768
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import numpy as np  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import schemas  # noqa: E402
+import serialization  # noqa: E402
+
+
+def make_results(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return [
+        {
+            "id": f"doc-{i // 10}-chunk-{i}",
+            "document": "lorem ipsum dolor sit amet " * 20,
+            "distance": float(rng.random()),
+            "metadata": {"document_id": i // 10, "page": i % 40, "source": f"file-{i // 10}.pdf"},
+            "embedding": vectors[i],
+        }
+        for i in range(n)
+    ]
+
+
+def default_path(results):
+    payload = {
+        "results": [dict(r, embedding=r["embedding"].tolist()) for r in results],
+        "vector_encoding": "json",
+    }
+    validated = schemas.SearchResponse.model_validate(payload)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def orjson_path(encoding):
+    def render(results):
+        payload = {
+            "results": [
+                dict(r, embedding=serialization.encode_vector(r["embedding"], encoding))
+                for r in results
+            ],
+            "vector_encoding": encoding,
+        }
+        return serialization.FastJSONResponse(payload).body
+    return render
+
+
+def measure(render, results, iterations: int):
+    render(results)  # warm up
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    size = 0
+    for _ in range(iterations):
+        size = len(render(results))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return size, size * iterations / wall, cpu / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    results = make_results(args.results, args.dim)
+    paths = {
+        "default (validate + jsonable_encoder + json)": default_path,
+        "orjson, vectors as JSON": orjson_path("json"),
+        "orjson, vectors as base64 float32": orjson_path("base64"),
+        "orjson, no vectors": orjson_path("none"),
+    }
+
+    print(f"{args.results} results x {args.dim} dims, {args.iterations} iterations\n")
+    print(f"{'path':<46} {'bytes/resp':>11} {'MB/s':>9} {'CPU ms/resp':>12}")
+    baseline_cpu = None
+    for name, render in paths.items():
+        size, bytes_per_sec, cpu = measure(render, results, args.iterations)
+        baseline_cpu = baseline_cpu or cpu
+        print(
+            f"{name:<46} {size:>11} {bytes_per_sec / 1e6:>9.1f} "
+            f"{cpu * 1000:>8.2f} ({baseline_cpu / cpu:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Admission Control and Load Shedding
+
+ASGI middleware that runs just inside `MetricsMiddleware` and decides, before
+any endpoint code runs, whether a request may proceed:
+
+1. Load shedding (per process): an AIMD concurrency limit adapts to observed
+   latency; requests beyond it get a fast 503 instead of queueing. Routes
+   that are slow by design (password hashing, uploads) don't feed it.
+2. Per-user rate limit and concurrency limit (shared across workers): a
+   token bucket and a set of in-flight request leases in Redis, checked in
+   one atomic Lua script. Requests over either limit get a 429. A lease
+   left behind by a killed worker expires on its own.
+
+Redis errors fail open, so an outage degrades to local shedding only; a
+circuit breaker then skips Redis for a few seconds, so requests don't each
+wait out the socket timeout.
+"""
+
+import json
+import time
+import uuid
+
+from jose import JWTError, jwt
+from pydantic_settings import BaseSettings
+
+from database import settings
+from monitoring import (
+    admission_concurrency_limit,
+    admission_in_flight,
+    admission_shed_total,
+    admission_throttled_total,
+    logger,
+)
+
+
+class AdmissionSettings(BaseSettings):
+    """Loads admission-control settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_EXEMPT_PATHS: list[str] = ["/health", "/metrics"]
+
+    # Per-user limits, shared through Redis
+    RATE_LIMIT_PER_SECOND: float = 20.0
+    RATE_LIMIT_BURST: int = 40
+    MAX_CONCURRENT_PER_USER: int = 8
+    # A request's concurrency slot is released after this long even if the
+    # worker serving it died
+    INFLIGHT_LEASE_SECONDS: int = 300
+    # After a Redis error, skip the shared checks (fail open) for this long
+    ADMISSION_REDIS_RETRY_SECONDS: float = 5.0
+
+    # Per-process adaptive shedding
+    SHED_MAX_IN_FLIGHT: int = 256
+    SHED_MIN_IN_FLIGHT: int = 8
+    SHED_LATENCY_TARGET_SECONDS: float = 1.0
+    # Slow by design (bcrypt, large uploads): counted in flight, but their
+    # latency says nothing about overload
+    SHED_IGNORE_LATENCY_PATHS: list[str] = [
+        "/token",
+        "/users/register",
+        "/admin/users/bulk",
+        "/vectors/import",
+    ]
+
+
+admission_settings = AdmissionSettings()
+
+
+# ============= Adaptive Concurrency Limit =============
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by time-to-response-start.
+
+    Each fast response grows the limit by 1/limit (about +1 per round of
+    requests). Slow responses shrink it multiplicatively, but at most once
+    per `decrease_interval` (default: the latency target), so a burst of
+    slow responses counts as one congestion signal rather than dozens.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int,
+        latency_target: float,
+        backoff: float = 0.9,
+        decrease_interval: float | None = None,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.decrease_interval = latency_target if decrease_interval is None else decrease_interval
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._last_decrease = float("-inf")
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def observe(self, latency: float, now: float | None = None):
+        if latency > self.latency_target:
+            now = time.monotonic() if now is None else now
+            if now - self._last_decrease >= self.decrease_interval:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+
+# ============= Shared Per-User Limits =============
+# KEYS[1] = token bucket hash, KEYS[2] = in-flight leases (ZSET of request
+# id -> expiry in ms; expired leases are trimmed on every check)
+# ARGV = rate/s, burst, max concurrent, request id, lease ms
+# Returns {1, 0} if admitted, {0, retry_ms} if rate limited,
+# {-1, 0} if over the concurrency limit.
+ADMIT_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_concurrent = tonumber(ARGV[3])
+local request_id = ARGV[4]
+local lease = tonumber(ARGV[5])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local ts = tonumber(redis.call('HGET', KEYS[1], 'ts'))
+if tokens == nil or ts == nil then
+    tokens = burst
+    ts = now
+end
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local ttl = math.ceil(burst / rate * 1000) + 1000
+
+if tokens < 1 then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], ttl)
+    return {0, math.ceil((1 - tokens) / rate * 1000)}
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= max_concurrent then
+    return {-1, 0}
+end
+redis.call('ZADD', KEYS[2], now + lease, request_id)
+-- The key outlives its newest lease; older leases are trimmed above
+redis.call('PEXPIRE', KEYS[2], lease)
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], ttl)
+return {1, 0}
+"""
+
+
+def bearer_token(scope) -> str | None:
+    """The raw bearer token from an ASGI scope's Authorization header, if any."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+            break
+    return None
+
+
+def client_identity(scope) -> str:
+    """The authenticated username if a valid bearer token is present, else the client IP."""
+    token = bearer_token(scope)
+    if token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+# ============= Middleware =============
+class AdmissionControlMiddleware:
+    def __init__(self, app, redis_client=None, limiter: AdaptiveLimiter | None = None):
+        self.app = app
+        self._redis = redis_client
+        self._script = None
+        # Circuit breaker: no Redis calls until this time.monotonic()
+        self._redis_retry_at = 0.0
+        self.limiter = limiter or AdaptiveLimiter(
+            max_limit=admission_settings.SHED_MAX_IN_FLIGHT,
+            min_limit=admission_settings.SHED_MIN_IN_FLIGHT,
+            latency_target=admission_settings.SHED_LATENCY_TARGET_SECONDS,
+        )
+
+    def _get_redis(self):
+        if self._redis is None:
+            from redis_client import get_async_redis
+            self._redis = get_async_redis()
+        return self._redis
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, error: Exception):
+        if self._redis_available():
+            logger.warning(
+                f"Admission checks failing open for "
+                f"{admission_settings.ADMISSION_REDIS_RETRY_SECONDS}s: {error}"
+            )
+        self._redis_retry_at = time.monotonic() + admission_settings.ADMISSION_REDIS_RETRY_SECONDS
+
+    async def _admit(self, identity: str, request_id: str) -> tuple[int, int]:
+        if self._script is None:
+            self._script = self._get_redis().register_script(ADMIT_SCRIPT)
+        result = await self._script(
+            keys=[f"vectorvault:rate:{identity}", f"vectorvault:inflight:{identity}"],
+            args=[
+                admission_settings.RATE_LIMIT_PER_SECOND,
+                admission_settings.RATE_LIMIT_BURST,
+                admission_settings.MAX_CONCURRENT_PER_USER,
+                request_id,
+                admission_settings.INFLIGHT_LEASE_SECONDS * 1000,
+            ],
+        )
+        return int(result[0]), int(result[1])
+
+    async def _release(self, identity: str, request_id: str):
+        try:
+            await self._get_redis().zrem(f"vectorvault:inflight:{identity}", request_id)
+        except Exception as e:
+            # The lease expires on its own
+            self._redis_failed(e)
+
+    @staticmethod
+    async def _reject(send, status_code: int, detail: str, retry_after: float):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not admission_settings.ADMISSION_ENABLED
+            or scope["path"] in admission_settings.ADMISSION_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # 1. Local load shedding: cheapest check first
+        if not self.limiter.try_acquire():
+            admission_shed_total.labels(reason="concurrency_limit").inc()
+            await self._reject(send, 503, "Server overloaded, retry shortly", 1)
+            return
+
+        identity = None
+        request_id = uuid.uuid4().hex
+        try:
+            # 2. Shared per-user limits
+            candidate = None  # nothing to release unless Redis admitted us
+            admitted, retry_ms = 1, 0
+            if self._redis_available():
+                candidate = client_identity(scope)
+                try:
+                    admitted, retry_ms = await self._admit(candidate, request_id)
+                except Exception as e:
+                    self._redis_failed(e)
+                    admitted, retry_ms = 1, 0
+                    candidate = None
+
+            if admitted == 0:
+                admission_throttled_total.labels(reason="rate").inc()
+                await self._reject(send, 429, "Rate limit exceeded", retry_ms / 1000)
+                return
+            if admitted == -1:
+                admission_throttled_total.labels(reason="concurrency").inc()
+                await self._reject(send, 429, "Too many concurrent requests", 1)
+                return
+            identity = candidate
+
+            admission_in_flight.set(self.limiter.in_flight)
+            start_time = time.perf_counter()
+            observe = scope["path"] not in admission_settings.SHED_IGNORE_LATENCY_PATHS
+
+            async def send_wrapper(message):
+                if observe and message["type"] == "http.response.start":
+                    self.limiter.observe(time.perf_counter() - start_time)
+                    admission_concurrency_limit.set(self.limiter.limit)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.limiter.release()
+            admission_in_flight.set(self.limiter.in_flight)
+            if identity is not None:
+                await self._release(identity, request_id)
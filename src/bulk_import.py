@@ -0,0 +1,227 @@
+"""
+Bulk Import of Precomputed Embeddings
+
+The API stages an upload to the shared data directory, validating it from
+the `.npy` header and line counts only; the vectors themselves are never
+decoded in the request. A Celery worker then memory-maps the staged array
+and writes it to the tenant's collection in large batches.
+
+Upload layout (multipart/form-data):
+    vectors   - a 2-D little-endian float32 `.npy` array, C order
+    ids       - UTF-8 text, one unique non-blank ID per line, same row
+                count as `vectors`
+    metadata  - optional JSON Lines, one non-empty object of scalar
+                values per row
+"""
+
+import hashlib
+import json
+import shutil
+import uuid
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+import numpy as np
+
+from vector_store import vector_settings
+
+MAX_DIMENSION = 8192
+COPY_BUFFER_SIZE = 1024 * 1024
+MAX_LINE_BYTES = 64 * 1024
+# Metadata value types ChromaDB accepts
+METADATA_TYPES = (str, int, float, bool)
+
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.txt"
+METADATA_FILE = "metadata.jsonl"
+
+
+class BulkImportError(ValueError):
+    """Raised when an upload is malformed."""
+
+
+@dataclass
+class StagedImport:
+    path: str
+    count: int
+    dimension: int
+
+
+def read_npy_header(fp: BinaryIO) -> tuple[tuple[int, ...], bool, np.dtype, int]:
+    """Parse an `.npy` header without reading the array data."""
+    try:
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    except ValueError as e:
+        raise BulkImportError(f"Invalid .npy header: {e}")
+    return shape, fortran_order, dtype, fp.tell()
+
+
+def _validate_vectors(fp: BinaryIO) -> tuple[int, int]:
+    shape, fortran_order, dtype, data_offset = read_npy_header(fp)
+    if dtype != np.dtype("<f4"):
+        raise BulkImportError(f"Vectors must be little-endian float32, got {dtype}")
+    if len(shape) != 2:
+        raise BulkImportError(f"Vectors must be a 2-D array, got shape {shape}")
+    if fortran_order:
+        raise BulkImportError("Vectors must be stored in C order")
+    count, dimension = shape
+    if count == 0 or not 0 < dimension <= MAX_DIMENSION:
+        raise BulkImportError(f"Unsupported vector shape {shape}")
+    if count * dimension > vector_settings.IMPORT_MAX_VALUES:
+        raise BulkImportError(f"At most {vector_settings.IMPORT_MAX_VALUES} vector values per import")
+
+    fp.seek(0, 2)
+    expected = data_offset + count * dimension * 4
+    if fp.tell() != expected:
+        raise BulkImportError(
+            f"Vector payload is {fp.tell()} bytes, header implies {expected}"
+        )
+    fp.seek(0)
+    return count, dimension
+
+
+class _IdChecker:
+    """
+    Rejects blank and duplicate ids. Each id is kept as a 64-bit hash in a
+    preallocated array (8 bytes per row) rather than a set of strings.
+    """
+
+    def __init__(self, count: int):
+        self.hashes = np.empty(count, dtype=np.uint64)
+        self.count = count
+
+    def __call__(self, number: int, line: bytes):
+        if number > self.count:
+            raise BulkImportError(f"Got more than {self.count} ids for {self.count} vectors")
+        if not line.strip():
+            raise BulkImportError(f"Id on line {number} is blank")
+        try:
+            line.decode("utf-8")
+        except UnicodeDecodeError:
+            raise BulkImportError(f"Id on line {number} is not valid UTF-8")
+        self.hashes[number - 1] = int.from_bytes(hashlib.blake2b(line, digest_size=8).digest(), "little")
+
+    def check_unique(self, lines: int):
+        hashes = np.sort(self.hashes[:lines])
+        if lines > 1 and (hashes[1:] == hashes[:-1]).any():
+            raise BulkImportError("Ids must be unique")
+
+
+def _check_metadata(number: int, line: bytes):
+    """Each row must be a non-empty JSON object of scalar values, as Chroma requires."""
+    try:
+        row = json.loads(line)
+    except ValueError:
+        raise BulkImportError(f"Metadata line {number} is not valid JSON")
+    if not isinstance(row, dict) or not row:
+        raise BulkImportError(f"Metadata line {number} must be a non-empty JSON object")
+    for value in row.values():
+        if not isinstance(value, METADATA_TYPES):
+            raise BulkImportError(
+                f"Metadata line {number}: values must be strings, numbers or booleans"
+            )
+
+
+def _copy_lines(src: BinaryIO, dst_path: Path, check_line: Callable[[int, bytes], None]) -> int:
+    """
+    Stream `src` to disk line by line, validating each line with
+    `check_line(number, line)` and normalizing CRLF line endings to LF.
+    Returns the number of lines.
+    """
+    max_bytes = vector_settings.IMPORT_MAX_FILE_BYTES
+    lines = 0
+    copied = 0
+    pending = b""
+    with open(dst_path, "wb") as dst:
+        while True:
+            block = src.read(COPY_BUFFER_SIZE)
+            if not block:
+                break
+            copied += len(block)
+            if copied > max_bytes:
+                raise BulkImportError(f"Files must be at most {max_bytes} bytes")
+            *complete, pending = (pending + block).split(b"\n")
+            out = []
+            for line in complete:
+                lines += 1
+                line = line.removesuffix(b"\r")
+                check_line(lines, line)
+                out.append(line + b"\n")
+            dst.writelines(out)
+            if len(pending) > MAX_LINE_BYTES:
+                raise BulkImportError(f"Line {lines + 1} is longer than {MAX_LINE_BYTES} bytes")
+        if pending:
+            lines += 1
+            pending = pending.removesuffix(b"\r")
+            check_line(lines, pending)
+            dst.write(pending + b"\n")
+    return lines
+
+
+def stage_upload(
+    owner_id: int,
+    vectors: BinaryIO,
+    ids: BinaryIO,
+    metadata: BinaryIO | None = None,
+) -> StagedImport:
+    """
+    Validate an upload and copy it to the shared import directory. Every
+    id and metadata row is checked here, so the import task cannot fail
+    partway on malformed input.
+    """
+    count, dimension = _validate_vectors(vectors)
+
+    job_dir = Path(vector_settings.DATA_DIR) / "imports" / str(owner_id) / uuid.uuid4().hex
+    job_dir.mkdir(parents=True)
+    try:
+        with open(job_dir / VECTORS_FILE, "wb") as dst:
+            shutil.copyfileobj(vectors, dst, COPY_BUFFER_SIZE)
+
+        id_checker = _IdChecker(count)
+        id_count = _copy_lines(ids, job_dir / IDS_FILE, id_checker)
+        if id_count != count:
+            raise BulkImportError(f"Got {id_count} ids for {count} vectors")
+        id_checker.check_unique(id_count)
+
+        if metadata is not None:
+            meta_count = _copy_lines(metadata, job_dir / METADATA_FILE, _check_metadata)
+            if meta_count != count:
+                raise BulkImportError(f"Got {meta_count} metadata rows for {count} vectors")
+    except Exception:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+
+    return StagedImport(path=str(job_dir), count=count, dimension=dimension)
+
+
+def iter_batches(job_dir: str, batch_size: int) -> Iterator[tuple[list, np.ndarray, list | None]]:
+    """
+    Yield (ids, vectors, metadatas) batches from a staged import.
+    The vector file is memory-mapped, so only one batch is resident at a time.
+    """
+    path = Path(job_dir)
+    vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+    meta_path = path / METADATA_FILE
+
+    with open(path / IDS_FILE, encoding="utf-8") as id_file:
+        meta_file = open(meta_path, encoding="utf-8") if meta_path.exists() else None
+        try:
+            for start in range(0, len(vectors), batch_size):
+                batch_ids = [line.rstrip("\n") for line in islice(id_file, batch_size)]
+                batch_meta = None
+                if meta_file is not None:
+                    batch_meta = [json.loads(line) for line in islice(meta_file, batch_size)]
+                yield batch_ids, np.asarray(vectors[start:start + len(batch_ids)]), batch_meta
+        finally:
+            if meta_file is not None:
+                meta_file.close()
+
+
+def discard(job_dir: str):
+    shutil.rmtree(job_dir, ignore_errors=True)
@@ -2,6 +2,8 @@ import os
 from celery import Celery
 # --- FIX: Removed 'src.' prefix ---
 from celery_config import celery_settings
+from profiling import install_task_hooks
+from tracing import install_celery_hooks
 
 # Create the Celery app instance
 celery_app = Celery(
@@ -14,4 +16,9 @@ celery_app = Celery(
 
 celery_app.conf.update(
     task_track_started=True,
-)
\ No newline at end of file
+)
+
+# Sampled task profiles (PROFILING_TASK_SAMPLE_RATE)
+install_task_hooks()
+# Trace context in task headers; imported by both the API and the worker
+install_celery_hooks()
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Streaming Chunking Engine
+
+Turns a lazy stream of page texts into overlapping, token-budgeted chunks.
+Only the current page and the active chunk window are ever held in memory,
+so documents of any size can be chunked with a flat memory profile.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+# Rough average for English text with BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class Chunk:
+    """A single chunk of a document, with offsets back into the source."""
+    index: int
+    text: str
+    start_offset: int  # absolute character offset in the document
+    end_offset: int
+    page_start: int  # 1-based page numbers
+    page_end: int
+    token_count: int
+
+
+# ============= Token Counting =============
+class TokenCounter:
+    """
+    Fast token-length estimator with an exact fallback.
+
+    The estimate is a character heuristic and is used to place chunk
+    boundaries. When `tiktoken` is installed, the exact count is used to
+    verify each chunk before it is emitted.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base", exact: bool = True):
+        self._encoding = None
+        if exact:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(encoding_name)
+            except Exception:
+                self._encoding = None
+
+    @property
+    def has_exact(self) -> bool:
+        return self._encoding is not None
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        stripped = len(text.strip())
+        if stripped == 0:
+            return 0
+        return max(1, -(-stripped // CHARS_PER_TOKEN))
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return self.estimate(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+# ============= Page Sources =============
+def iter_pdf_pages(file_path: str) -> Iterator[str]:
+    """Yield the text of each PDF page, one page at a time."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+# ============= Chunker =============
+class _Window:
+    """
+    Sliding text buffer over the page stream.
+
+    Holds at most one chunk budget plus one page of text. `segments` maps
+    buffer positions back to absolute source offsets and page numbers, since
+    a separator may be inserted between pages.
+    """
+
+    def __init__(self, pages: Iterable[str]):
+        self._pages = enumerate(pages, start=1)
+        self.text = ""
+        self.exhausted = False
+        self._positions: list[int] = []
+        self._segments: list[tuple[int, int]] = []  # (source_offset, page_no)
+        self._source_offset = 0
+
+    def fill(self, min_chars: int):
+        while not self.exhausted and len(self.text) <= min_chars:
+            item = next(self._pages, None)
+            if item is None:
+                self.exhausted = True
+                break
+            page_no, page_text = item
+            if self.text and not self.text[-1].isspace():
+                self.text += "\n"
+            self._positions.append(len(self.text))
+            self._segments.append((self._source_offset, page_no))
+            self.text += page_text
+            self._source_offset += len(page_text)
+            self.advance(len(self.text) - len(self.text.lstrip()))
+
+    def advance(self, n: int):
+        """Drop the first `n` characters plus any whitespace that follows."""
+        n = len(self.text) - len(self.text[n:].lstrip())
+        if n == 0:
+            return
+        self.text = self.text[n:]
+        self._positions = [p - n for p in self._positions]
+        # Keep the segment containing position 0 and everything after it.
+        first = max(0, bisect_right(self._positions, 0) - 1)
+        del self._positions[:first]
+        del self._segments[:first]
+
+    def locate(self, pos: int) -> tuple[int, int]:
+        """Map a buffer position to (source_offset, page_no)."""
+        i = max(0, bisect_right(self._positions, pos) - 1)
+        source_offset, page_no = self._segments[i]
+        return source_offset + (pos - self._positions[i]), page_no
+
+    def boundary(self, limit: int) -> int:
+        """Largest word boundary at or before `limit` (hard cut if none)."""
+        if limit >= len(self.text) or self.text[limit].isspace():
+            return min(limit, len(self.text))
+        cut = max(self.text.rfind(c, 0, limit) for c in " \n\t")
+        return cut if cut > 0 else limit
+
+
+def iter_chunks(
+    pages: Iterable[str],
+    max_tokens: int = 512,
+    overlap_tokens: int = 64,
+    counter: TokenCounter | None = None,
+) -> Iterator[Chunk]:
+    """
+    Lazily chunk a stream of pages.
+
+    Each chunk holds at most `max_tokens` tokens, and consecutive chunks
+    share roughly `overlap_tokens` tokens of trailing context.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError("overlap_tokens must be in [0, max_tokens)")
+
+    counter = counter or TokenCounter()
+    budget = max_tokens * CHARS_PER_TOKEN
+    overlap = overlap_tokens * CHARS_PER_TOKEN
+    window = _Window(pages)
+    index = 0
+
+    while True:
+        window.fill(budget)
+        if not window.text:
+            return
+
+        # The estimate picks the boundary; trim until the exact count fits.
+        end = window.boundary(budget)
+        text = window.text[:end].rstrip()
+        tokens = counter.count(text)
+        while tokens > max_tokens and end > 1:
+            limit = min(end - 1, max(1, end * max_tokens // tokens))
+            end = window.boundary(limit)
+            text = window.text[:end].rstrip()
+            tokens = counter.count(text)
+
+        start_offset, page_start = window.locate(0)
+        end_offset, page_end = window.locate(len(text) - 1)
+        yield Chunk(
+            index=index,
+            text=text,
+            start_offset=start_offset,
+            end_offset=end_offset + 1,
+            page_start=page_start,
+            page_end=page_end,
+            token_count=tokens,
+        )
+        index += 1
+
+        if window.exhausted and end >= len(window.text):
+            return
+
+        # Restart at the first word boundary inside the overlap region,
+        # but always make progress.
+        next_start = end
+        if overlap and end - overlap > 0:
+            match = _WHITESPACE_RE.search(window.text, end - overlap, end)
+            if match and 0 < match.end() < end:
+                next_start = match.end()
+        window.advance(next_start)
@@ -1,14 +1,21 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import models, schemas, security  # <-- Fixed import
+from monitoring import MetricsCollector
+from pagination import keyset_page
+from tracing import traced
 
+@traced("crud.get_user")
 def get_user(db: Session, user_id: int):
     """Get a single user by ID."""
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+@traced("crud.get_user_by_username")
 def get_user_by_username(db: Session, username: str):
     """Get a single user by username."""
     return db.query(models.User).filter(models.User.username == username).first()
 
+@traced("crud.create_user")
 def create_user(db: Session, user: schemas.UserCreate):
     """Create a new user and store in the database."""
     hashed_password = security.get_password_hash(user.password)
@@ -19,4 +26,135 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    MetricsCollector.track_rows_created("users")
+    return db_user
+
+@traced("crud.get_existing_usernames")
+def get_existing_usernames(db: Session, usernames: list[str]) -> set[str]:
+    """Which of `usernames` are already taken, in one IN query."""
+    if not usernames:
+        return set()
+    rows = db.query(models.User.username).filter(models.User.username.in_(usernames)).all()
+    return {row.username for row in rows}
+
+@traced("crud.create_users_bulk")
+def create_users_bulk(db: Session, users: list[tuple[str, str]]) -> dict[str, int]:
+    """
+    Insert (username, hashed_password) pairs with one multi-row INSERT and
+    a single commit. Rows whose username already exists (e.g. registered
+    concurrently) are skipped via ON CONFLICT DO NOTHING on Postgres and
+    SQLite. Returns {username: id} for the rows actually inserted.
+    """
+    if not users:
+        return {}
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    values = [
+        {"username": username, "hashed_password": hashed_password, "is_active": True, "is_admin": False}
+        for username, hashed_password in users
+    ]
+    if dialect_insert is not None:
+        stmt = dialect_insert(models.User).values(values).on_conflict_do_nothing(index_elements=["username"])
+    else:
+        stmt = insert(models.User).values(values)
+    rows = db.execute(stmt.returning(models.User.id, models.User.username)).all()
+    db.commit()
+    MetricsCollector.track_rows_created("users", len(rows))
+    return {row.username: row.id for row in rows}
+
+# --- Knowledge Bases, Documents, Chunks ---
+# List functions return (rows, next_cursor); see pagination.keyset_page.
+
+@traced("crud.create_knowledge_base")
+def create_knowledge_base(db: Session, kb: schemas.KnowledgeBaseCreate, owner_id: int):
+    """Create a new knowledge base owned by a user."""
+    db_kb = models.KnowledgeBase(owner_id=owner_id, name=kb.name, description=kb.description)
+    db.add(db_kb)
+    db.commit()
+    db.refresh(db_kb)
+    MetricsCollector.track_rows_created("knowledge_bases")
+    return db_kb
+
+@traced("crud.get_knowledge_base")
+def get_knowledge_base(db: Session, kb_id: int, owner_id: int):
+    """Get a knowledge base by ID, only if the user owns it."""
+    return db.query(models.KnowledgeBase).filter(
+        models.KnowledgeBase.id == kb_id,
+        models.KnowledgeBase.owner_id == owner_id
+    ).first()
+
+@traced("crud.list_knowledge_bases")
+def list_knowledge_bases(db: Session, owner_id: int, limit: int, cursor: str | None = None):
+    """A user's knowledge bases, newest first."""
+    query = db.query(models.KnowledgeBase).filter(models.KnowledgeBase.owner_id == owner_id)
+    return keyset_page(query, [models.KnowledgeBase.created_at, models.KnowledgeBase.id], limit, cursor)
+
+@traced("crud.list_documents")
+def list_documents(db: Session, owner_id: int, kb_id: int, limit: int, cursor: str | None = None):
+    """The documents of one of the user's knowledge bases, newest first."""
+    query = db.query(models.Document).filter(
+        models.Document.knowledge_base_id == kb_id,
+        models.Document.owner_id == owner_id
+    )
+    return keyset_page(query, [models.Document.created_at, models.Document.id], limit, cursor)
+
+@traced("crud.get_document")
+def get_document(db: Session, document_id: int, owner_id: int):
+    """Get a document by ID, only if the user owns it."""
+    return db.query(models.Document).filter(
+        models.Document.id == document_id,
+        models.Document.owner_id == owner_id
+    ).first()
+
+@traced("crud.list_chunks")
+def list_chunks(db: Session, owner_id: int, document_id: int, limit: int, cursor: str | None = None):
+    """The chunks of one of the user's documents, in document order."""
+    query = db.query(models.Chunk).filter(
+        models.Chunk.document_id == document_id,
+        models.Chunk.owner_id == owner_id
+    )
+    return keyset_page(query, [models.Chunk.index], limit, cursor, descending=False)
+
+@traced("crud.set_document_status")
+def set_document_status(db: Session, document_id: int, status: str, chunk_count: int | None = None):
+    """Update a document's processing status (and chunk count once known)."""
+    values = {"status": status}
+    if chunk_count is not None:
+        values["chunk_count"] = chunk_count
+    db.query(models.Document).filter(models.Document.id == document_id).update(values)
+    db.commit()
+
+@traced("crud.delete_chunks")
+def delete_chunks(db: Session, document_id: int) -> int:
+    """
+    Delete a document's chunks (before re-ingesting it); returns how many
+    there were. Not committed: the caller commits it together with the
+    first batch of new chunks, so a failed re-ingest keeps the old ones.
+    """
+    return db.query(models.Chunk).filter(models.Chunk.document_id == document_id).delete()
+
+@traced("crud.add_chunks")
+def add_chunks(db: Session, owner_id: int, document_id: int, chunks: list):
+    """Insert a batch of `chunking.Chunk`s with one executemany and a single commit."""
+    if not chunks:
+        return
+    db.execute(insert(models.Chunk), [
+        {
+            "owner_id": owner_id,
+            "document_id": document_id,
+            "index": chunk.index,
+            "text": chunk.text,
+            "token_count": chunk.token_count,
+            "page_start": chunk.page_start,
+            "page_end": chunk.page_end,
+        }
+        for chunk in chunks
+    ])
+    db.commit()
+    MetricsCollector.track_rows_created("chunks", len(chunks))
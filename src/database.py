@@ -17,6 +17,9 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # Optional full URL override (e.g. SQLite for local benchmarks)
+    DATABASE_URL: str | None = None
+
     class Config:
         env_file = ".env"
 
@@ -25,13 +28,15 @@ settings = Settings()
 
 # --- Database URL ---
 # This is the connection string for SQLAlchemy
-DATABASE_URL = (
+DATABASE_URL = settings.DATABASE_URL or (
     f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@"
     f"{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
 )
 
 # --- SQLAlchemy Setup ---
-engine = create_engine(DATABASE_URL)
+# SQLite connections are used from FastAPI's threadpool, not the creating thread
+connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -0,0 +1,163 @@
+"""
+Answer Generation
+
+Pluggable token generators for RAG answers, plus the bridge that streams
+a (blocking) generator to an async consumer with bounded buffering.
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator
+
+from pydantic_settings import BaseSettings
+
+from monitoring import MetricsCollector
+
+
+class GenerationSettings(BaseSettings):
+    """Loads answer-generation settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    GENERATOR_BACKEND: str = "echo"
+    CHAT_TOP_K: int = 4
+    # Max tokens buffered between the generator thread and the client
+    CHAT_STREAM_BUFFER: int = 32
+
+
+generation_settings = GenerationSettings()
+
+
+# ============= Generators =============
+class Generator(ABC):
+    """
+    Base class for answer generators.
+
+    `generate` is a blocking iterator of text tokens; it runs in a worker
+    thread, so implementations may call synchronous model clients directly.
+    """
+
+    @abstractmethod
+    def generate(self, query: str, context: list[str]) -> Iterator[str]:
+        """Yield the answer to `query` token by token."""
+
+
+class EchoGenerator(Generator):
+    """
+    Deterministic local stand-in: answers by quoting the retrieved context.
+    Used in tests and whenever no model backend is configured.
+    """
+
+    def __init__(self, delay: float = 0.0, max_words_per_source: int = 30):
+        self.delay = delay
+        self.max_words_per_source = max_words_per_source
+
+    def generate(self, query: str, context: list[str]) -> Iterator[str]:
+        if not context:
+            words = ["No", "relevant", "context", "found", "for:"] + query.split()
+        else:
+            words = ["Based", "on", f"{len(context)}", "sources:"]
+            for snippet in context:
+                words += snippet.split()[:self.max_words_per_source]
+        for i, word in enumerate(words):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word if i == 0 else " " + word
+
+
+_GENERATORS: dict[str, Callable[[], Generator]] = {
+    "echo": EchoGenerator,
+}
+
+
+def register_generator(name: str, factory: Callable[[], Generator]):
+    """Make a generator backend selectable through GENERATOR_BACKEND."""
+    _GENERATORS[name] = factory
+
+
+def get_generator(name: str | None = None) -> Generator:
+    name = name or generation_settings.GENERATOR_BACKEND
+    try:
+        return _GENERATORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown generator backend: {name}")
+
+
+# ============= Streaming Bridge =============
+_DONE = object()
+
+
+def format_sse(data: dict, event: str | None = None) -> str:
+    """Encode one Server-Sent Events message."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def stream_tokens(
+    tokens: Iterator[str],
+    max_buffer: int | None = None,
+    started_at: float | None = None,
+) -> AsyncIterator[str]:
+    """
+    Run a blocking token iterator in a thread and yield its tokens.
+
+    The queue between the thread and the consumer is bounded, so a slow
+    client stalls the generator instead of buffering unboundedly. If the
+    consumer stops early (e.g. the client disconnects and the response task
+    is cancelled), the generator thread is told to stop at its next token.
+    Time-to-first-token (from `started_at`, a `time.perf_counter()` value
+    taken when the request arrived, so retrieval is included) and
+    tokens/sec are recorded when the stream ends.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer or generation_settings.CHAT_STREAM_BUFFER)
+    stop = threading.Event()
+
+    def produce():
+        item = _DONE
+        try:
+            for token in tokens:
+                if stop.is_set():
+                    break
+                # Blocks this thread while the queue is full
+                asyncio.run_coroutine_threadsafe(queue.put(token), loop).result()
+        except BaseException as e:  # surface generator errors to the consumer
+            item = e
+        finally:
+            close = getattr(tokens, "close", None)
+            if close is not None:
+                close()
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+
+    start_time = time.perf_counter()
+    first_token_at = None
+    count = 0
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            count += 1
+            yield item
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue
+        while not queue.empty():
+            queue.get_nowait()
+        MetricsCollector.track_generation(
+            time_to_first_token=(first_token_at - (started_at or start_time)) if first_token_at else None,
+            tokens=count,
+            duration=time.perf_counter() - start_time,
+        )
+    await producer
@@ -1,23 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Form
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status, Form, File, UploadFile
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import timedelta
 import time
+from collections import Counter
 from contextlib import asynccontextmanager
 import sqlalchemy.exc
 from typing import Annotated
 
+from fastapi.concurrency import run_in_threadpool
+
 # --- NEW: Import for /metrics endpoint ---
-from fastapi.responses import PlainTextResponse
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client.openmetrics import exposition as openmetrics
 # ---
 
 # Import all your project modules
-import crud, models, schemas, security
+import bulk_import, crud, generation, models, pagination, profiling, provisioning, retrieval, schemas
+import security, semantic_cache, serialization, snapshots, vector_store
 from database import engine, get_db, settings, SessionLocal
 from monitoring import MetricsMiddleware, MetricsCollector, HealthCheck
-from tasks import create_hello_world_task
+from admission import AdmissionControlMiddleware
+from profiling import ProfilingMiddleware
+from tracing import TracingMiddleware
+from tasks import (
+    create_hello_world_task,
+    import_vectors_task,
+    export_snapshot_task,
+    restore_snapshot_task,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -52,17 +65,26 @@ async def lifespan(app: FastAPI):
     yield
     
     print("Application shutdown...")
+    provisioning.shutdown()
 
 
 app = FastAPI(
     title="VectorVault API",
     description="A secure MLOps API for RAG pipelines.",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=serialization.FastJSONResponse
 )
 
-# --- 1. Add Monitoring Middleware ---
+# --- 1. Add Admission Control and Monitoring Middleware ---
+# Added first so it runs inside MetricsMiddleware, which then also
+# records the 429/503 responses it produces. Profiling is innermost so
+# rejected requests are never sampled; tracing is outermost so the root
+# span covers the whole request.
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 
 # --- 2. Authentication Endpoints ---
@@ -134,6 +156,15 @@ def health(db: Session = Depends(get_db)):
         )
 
 
+@app.get("/health/details")
+def health_details(db: Session = Depends(get_db)):
+    """
+    Detailed health: database, vector store, disk and memory.
+    """
+    # The vector_store module's heartbeat() goes through the pooled client
+    return HealthCheck(db, vector_store).get_health_status()
+
+
 # --- 5. Asynchronous Task Endpoint ---
 
 @app.post("/test-task")
@@ -148,11 +179,321 @@ def test_background_task():
     return {"message": "Task has been started in the background!"}
 
 
-# --- 6. Prometheus Metrics Endpoint (NEW) ---
+# --- 6. Bulk Import of Precomputed Embeddings ---
+
+@app.post("/vectors/import", response_model=schemas.BulkImportAccepted, status_code=status.HTTP_202_ACCEPTED)
+def import_vectors(
+    vectors: UploadFile = File(...),
+    ids: UploadFile = File(...),
+    metadata: UploadFile | None = File(None),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Queue a bulk import of precomputed float32 embeddings into the
+    current user's collection. Only the .npy header is decoded here.
+    """
+    try:
+        staged = bulk_import.stage_upload(
+            current_user.id,
+            vectors.file,
+            ids.file,
+            metadata.file if metadata else None,
+        )
+    except bulk_import.BulkImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    task = import_vectors_task.delay(staged.path, current_user.id)
+    return {"task_id": task.id, "count": staged.count, "dimension": staged.dimension}
+
+
+# --- 7. Snapshot Export / Restore ---
+
+@app.post("/snapshots", response_model=schemas.TaskAccepted, status_code=status.HTTP_202_ACCEPTED)
+def create_snapshot(
+    options: schemas.SnapshotRequest = schemas.SnapshotRequest(),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Queue a binary snapshot export of the current user's collection.
+    """
+    task = export_snapshot_task.delay(current_user.id, options.quantize)
+    return {"task_id": task.id}
+
+
+@app.get("/snapshots", response_model=list[schemas.SnapshotRead])
+def list_user_snapshots(current_user: models.User = Depends(security.get_current_active_user)):
+    """
+    List the current user's completed snapshots, newest first.
+    """
+    return snapshots.list_snapshots(current_user.id)
+
+
+@app.post("/snapshots/{snapshot_id}/restore", response_model=schemas.TaskAccepted, status_code=status.HTTP_202_ACCEPTED)
+def restore_snapshot(
+    snapshot_id: str,
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Queue a restore of one of the current user's snapshots.
+    """
+    try:
+        path = snapshots.snapshot_path(current_user.id, snapshot_id)
+    except snapshots.SnapshotError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not (path / "manifest.json").exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found")
+
+    task = restore_snapshot_task.delay(current_user.id, snapshot_id)
+    return {"task_id": task.id}
+
+
+# --- 8. Semantic Search ---
+
+@app.post("/search", response_model=schemas.SearchResponse)
+def search(
+    search_request: schemas.SearchRequest,
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Return the chunks closest to a query, optionally with their vectors.
+
+    The payload is built from trusted internal data and returned directly,
+    skipping response_model validation; `response_model` only documents it.
+    """
+    encoding = search_request.vector_encoding
+    chunks = retrieval.retrieve(
+        current_user.id,
+        search_request.query,
+        search_request.top_k,
+        include_embeddings=encoding != "none",
+    )
+    results = [
+        {
+            "id": c.id,
+            "document": c.document,
+            "distance": c.distance,
+            "metadata": c.metadata,
+            "embedding": serialization.encode_vector(c.embedding, encoding),
+        }
+        for c in chunks
+    ]
+    return serialization.FastJSONResponse({"results": results, "vector_encoding": encoding})
+
+
+# --- 9. Streaming RAG Answers ---
+
+def _sse_response(stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/chat")
+async def chat(
+    chat_request: schemas.ChatRequest,
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Retrieve context for a question and stream the answer as Server-Sent
+    Events: one `context` event, then one message per token, then `done`.
+    Near-duplicate questions are answered from the semantic cache.
+    """
+    started = time.perf_counter()
+    owner_id = current_user.id
+    query_embedding = (await run_in_threadpool(vector_store.embed_texts, [chat_request.query]))[0]
+
+    top_k = chat_request.top_k or generation.generation_settings.CHAT_TOP_K
+    backend = generation.generation_settings.GENERATOR_BACKEND
+
+    version = None
+    if semantic_cache.cache_settings.SEMANTIC_CACHE_ENABLED:
+        version = await run_in_threadpool(semantic_cache.tenant_version, owner_id)
+    if version is not None:
+        cached = semantic_cache.answer_cache.lookup(owner_id, query_embedding, version, top_k, backend)
+        if cached is not None:
+            async def cached_stream():
+                yield generation.format_sse({"sources": cached.sources, "cached": True}, event="context")
+                yield generation.format_sse({"token": cached.answer})
+                yield generation.format_sse({}, event="done")
+            return _sse_response(cached_stream())
+
+    chunks = await run_in_threadpool(
+        retrieval.retrieve, owner_id, chat_request.query, top_k, query_embedding
+    )
+    sources = [{"id": c.id, "distance": c.distance, "metadata": c.metadata} for c in chunks]
+    tokens = generation.get_generator(backend).generate(
+        chat_request.query, [c.document for c in chunks if c.document]
+    )
+
+    async def event_stream():
+        yield generation.format_sse({"sources": sources, "cached": False}, event="context")
+        answer = []
+        try:
+            async for token in generation.stream_tokens(tokens, started_at=started):
+                answer.append(token)
+                yield generation.format_sse({"token": token})
+        except Exception as e:
+            yield generation.format_sse({"detail": str(e)}, event="error")
+            return
+        if version is not None:
+            semantic_cache.answer_cache.store(
+                owner_id, query_embedding, version, "".join(answer), sources,
+                latency=time.perf_counter() - started, top_k=top_k, backend=backend,
+            )
+        yield generation.format_sse({}, event="done")
+
+    return _sse_response(event_stream())
+
+
+# --- 10. Prometheus Metrics Endpoint (NEW) ---
 
 @app.get("/metrics", response_class=PlainTextResponse)
-def metrics():
+def metrics(request: Request, db: Session = Depends(get_db)):
     """
     Prometheus metrics endpoint.
+    Scrapers that accept OpenMetrics also get the stage exemplars (trace ids).
+    """
+    MetricsCollector.refresh_row_counts(db)
+    if "application/openmetrics-text" in request.headers.get("accept", ""):
+        return Response(openmetrics.generate_latest(REGISTRY), media_type=openmetrics.CONTENT_TYPE_LATEST)
+    return generate_latest()
+
+
+# --- 11. On-demand Profiles (admin only) ---
+
+@app.get("/admin/profiles", response_model=list[schemas.ProfileSummary])
+def list_profiles(current_user: models.User = Depends(security.get_current_admin_user)):
+    """
+    List recent request and task profiles, newest first.
+    """
+    return [p.summary() for p in profiling.list_profiles()]
+
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(
+    profile_id: str,
+    current_user: models.User = Depends(security.get_current_admin_user)
+):
+    """
+    Return one profile as collapsed stacks, ready for flamegraph.pl or speedscope.
+    """
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile.collapsed()
+
+
+# --- 12. Knowledge Bases (keyset-paginated listings) ---
+
+PageLimit = Annotated[int, Query(ge=1, le=100)]
+
+
+def _page(rows, next_cursor) -> dict:
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def _invalid_cursor(e: pagination.CursorError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@app.post("/knowledge-bases", response_model=schemas.KnowledgeBaseRead, status_code=status.HTTP_201_CREATED)
+def create_knowledge_base(
+    kb: schemas.KnowledgeBaseCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
     """
-    return generate_latest()
\ No newline at end of file
+    Create a knowledge base for the current user.
+    """
+    return crud.create_knowledge_base(db, kb, owner_id=current_user.id)
+
+
+@app.get("/knowledge-bases", response_model=schemas.Page[schemas.KnowledgeBaseRead])
+def list_knowledge_bases(
+    limit: PageLimit = 20,
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    List the current user's knowledge bases, newest first.
+    Pass the returned `next_cursor` as `cursor` to get the next page.
+    """
+    try:
+        return _page(*crud.list_knowledge_bases(db, current_user.id, limit, cursor))
+    except pagination.CursorError as e:
+        raise _invalid_cursor(e)
+
+
+@app.get("/knowledge-bases/{kb_id}/documents", response_model=schemas.Page[schemas.DocumentRead])
+def list_documents(
+    kb_id: int,
+    limit: PageLimit = 20,
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    List the documents in one of the current user's knowledge bases, newest first.
+    """
+    if crud.get_knowledge_base(db, kb_id, current_user.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Knowledge base not found")
+    try:
+        return _page(*crud.list_documents(db, current_user.id, kb_id, limit, cursor))
+    except pagination.CursorError as e:
+        raise _invalid_cursor(e)
+
+
+@app.get("/documents/{document_id}/chunks", response_model=schemas.Page[schemas.ChunkRead])
+def list_chunks(
+    document_id: int,
+    limit: PageLimit = 50,
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    List the chunks of one of the current user's documents, in document order.
+    """
+    if crud.get_document(db, document_id, current_user.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    try:
+        return _page(*crud.list_chunks(db, current_user.id, document_id, limit, cursor))
+    except pagination.CursorError as e:
+        raise _invalid_cursor(e)
+
+
+# --- 13. Bulk User Provisioning (admin only) ---
+
+@app.post("/admin/users/bulk", response_model=schemas.BulkProvisionResponse)
+async def bulk_provision_users(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_admin_user)
+):
+    """
+    Create users from an NDJSON body, one {"username", "password"} object
+    per line. Returns one result per line, in order: created, exists,
+    duplicate (repeated in the upload) or invalid. If the upload is too
+    large, the lines before the limit are still provisioned and the
+    response is a 413 whose last result is `rejected`.
+    """
+    results = await provisioning.provision_users(db, request.stream())
+
+    counts = Counter(r["status"] for r in results)
+    return serialization.FastJSONResponse(
+        {
+            "created": counts["created"],
+            "exists": counts["exists"],
+            "duplicate": counts["duplicate"],
+            "invalid": counts["invalid"],
+            "rejected": counts["rejected"],
+            "results": results,
+        },
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if counts["rejected"] else status.HTTP_200_OK,
+    )
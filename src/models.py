@@ -1,6 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Text, false, func
+from sqlalchemy.orm import relationship
 from database import Base  # <-- Fixed import
 
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class User(Base):
     """SQLAlchemy model for the User table."""
     __tablename__ = "users"
@@ -9,5 +17,72 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
-    
-    # We will add relationships to KnowledgeBases later
\ No newline at end of file
+    # Grants access to operational endpoints (profiling, provisioning)
+    is_admin = Column(Boolean, default=False, server_default=false(), nullable=False)
+
+    knowledge_bases = relationship("KnowledgeBase", back_populates="owner")
+
+
+# Listing indexes end in `id` as well: keyset pagination orders by
+# (created_at, id), so ties on created_at are resolved inside the index.
+
+class KnowledgeBase(Base):
+    """SQLAlchemy model for a user's collection of documents."""
+    __tablename__ = "knowledge_bases"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now(), nullable=False)
+
+    owner = relationship("User", back_populates="knowledge_bases")
+    documents = relationship("Document", back_populates="knowledge_base", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_knowledge_bases_owner_id_created_at", "owner_id", "created_at", "id"),
+    )
+
+
+class Document(Base):
+    """SQLAlchemy model for an uploaded source document."""
+    __tablename__ = "documents"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    knowledge_base_id = Column(Integer, ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    status = Column(String, default="pending", server_default="pending", nullable=False)
+    chunk_count = Column(Integer, default=0, server_default="0", nullable=False)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now(), nullable=False)
+
+    knowledge_base = relationship("KnowledgeBase", back_populates="documents")
+    chunks = relationship("Chunk", back_populates="document", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_documents_owner_id_created_at", "owner_id", "created_at", "id"),
+        Index("ix_documents_knowledge_base_id_created_at", "knowledge_base_id", "created_at", "id"),
+    )
+
+
+class Chunk(Base):
+    """SQLAlchemy model for one chunk of a document (its vector lives in ChromaDB)."""
+    __tablename__ = "chunks"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    # Position of the chunk within its document
+    index = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    page_start = Column(Integer, nullable=True)
+    page_end = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now(), nullable=False)
+
+    document = relationship("Document", back_populates="chunks")
+
+    __table_args__ = (
+        Index("ix_chunks_owner_id_created_at", "owner_id", "created_at", "id"),
+        Index("ix_chunks_document_id_index", "document_id", "index", unique=True),
+    )
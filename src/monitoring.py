@@ -3,9 +3,11 @@ Monitoring and Observability Module
 """
 
 from prometheus_client import Counter, Histogram, Gauge
+from sqlalchemy import text
 from functools import wraps
 import time
 import logging
+from contextvars import ContextVar
 from typing import Callable
 from datetime import datetime
 
@@ -29,11 +31,11 @@ http_request_duration_seconds = Histogram(
 )
 active_users = Gauge(
     'active_users_total',
-    'Number of active users in the system'
+    'Number of users in the system (estimated from table statistics)'
 )
 knowledge_bases_total = Gauge(
     'knowledge_bases_total',
-    'Total number of knowledge bases'
+    'Total number of knowledge bases (estimated from table statistics)'
 )
 documents_processed_total = Counter(
     'documents_processed_total',
@@ -44,16 +46,107 @@ vector_search_duration_seconds = Histogram(
     'vector_search_duration_seconds',
     'Vector search operation duration in seconds'
 )
+rerank_duration_seconds = Histogram(
+    'rerank_duration_seconds',
+    'Post-retrieval MMR re-ranking duration in seconds',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+vector_db_calls_total = Counter(
+    'vector_db_calls_total',
+    'Calls made to the vector database',
+    ['operation']
+)
+vector_db_calls_per_request = Histogram(
+    'vector_db_calls_per_request',
+    'Vector database calls made while serving one HTTP request (requests with at least one)',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+vector_db_batch_size = Histogram(
+    'vector_db_batch_size',
+    'Records per vector database write or delete call',
+    ['operation'],
+    buckets=(1, 10, 50, 100, 500, 1000, 2500, 5000, 10000, 25000)
+)
+collection_cache_requests_total = Counter(
+    'collection_cache_requests_total',
+    'Tenant collection handle lookups',
+    ['result']  # hit or miss
+)
 embeddings_created_total = Counter(
     'embeddings_created_total',
     'Total number of embeddings created'
 )
+vectors_imported_total = Counter(
+    'vectors_imported_total',
+    'Total number of precomputed vectors imported in bulk'
+)
+bulk_import_throughput = Histogram(
+    'bulk_import_vectors_per_second',
+    'Throughput of bulk vector imports in vectors per second',
+    buckets=(100, 500, 1000, 5000, 10000, 25000, 50000, 100000, 250000)
+)
+chat_time_to_first_token_seconds = Histogram(
+    'chat_time_to_first_token_seconds',
+    'Time from the chat request arriving to the first streamed token',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+chat_tokens_per_second = Histogram(
+    'chat_tokens_per_second',
+    'Streaming rate of generated answer tokens',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+semantic_cache_requests_total = Counter(
+    'semantic_cache_requests_total',
+    'Semantic answer cache lookups',
+    ['result']  # hit or miss
+)
+semantic_cache_hit_ratio = Gauge(
+    'semantic_cache_hit_ratio',
+    'Fraction of semantic cache lookups served from the cache (this process)'
+)
+semantic_cache_saved_seconds_total = Counter(
+    'semantic_cache_saved_seconds_total',
+    'Retrieval and generation time avoided by semantic cache hits'
+)
+admission_throttled_total = Counter(
+    'admission_throttled_total',
+    'Requests rejected with 429 by per-user admission control',
+    ['reason']  # rate or concurrency
+)
+admission_shed_total = Counter(
+    'admission_shed_total',
+    'Requests rejected with 503 by adaptive load shedding',
+    ['reason']
+)
+admission_in_flight = Gauge(
+    'admission_in_flight',
+    'Requests currently admitted in this process'
+)
+admission_concurrency_limit = Gauge(
+    'admission_concurrency_limit',
+    'Current adaptive concurrency limit of this process'
+)
+stage_duration_seconds = Histogram(
+    'stage_duration_seconds',
+    'Duration of traced request and task stages (exemplars carry trace ids)',
+    ['stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+profiles_captured_total = Counter(
+    'profiles_captured_total',
+    'On-demand stack profiles captured',
+    ['kind']  # request or task
+)
 errors_total = Counter(
     'errors_total',
     'Total number of errors encountered',
     ['error_type']
 )
 
+# Vector DB calls made by the current request; a one-item list so calls made
+# in threadpool copies of the context still add to the request's count
+_vector_db_calls: ContextVar[list | None] = ContextVar("vector_db_calls", default=None)
+
 # ============= Metrics Middleware =============
 class MetricsMiddleware:
     def __init__(self, app):
@@ -90,7 +183,14 @@ class MetricsMiddleware:
             
             await send(message)
         
-        await self.app(scope, receive, send_wrapper)
+        calls = [0]
+        token = _vector_db_calls.set(calls)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _vector_db_calls.reset(token)
+            if calls[0]:
+                vector_db_calls_per_request.observe(calls[0])
 
 # ============= Performance Tracking Decorators =============
 def track_time(metric_name: str = None):
@@ -161,8 +261,32 @@ def track_error(error_type: str = None):
             return sync_wrapper
     return decorator
 
+# ============= Row Count Estimates =============
+def estimate_row_count(db, table: str) -> int:
+    """
+    Row count of `table` from the cumulative statistics on Postgres
+    (pg_stat_user_tables.n_live_tup, updated as transactions commit in any
+    process, unlike pg_class.reltuples which only moves on ANALYZE or
+    autovacuum): a catalog lookup instead of a full COUNT(*) scan. Other
+    databases, and tables without a statistics entry, fall back to COUNT(*).
+    `table` must be a trusted table name, not user input.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT n_live_tup FROM pg_stat_user_tables WHERE relid = to_regclass(:table)"),
+            {"table": table}
+        ).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return db.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+
 # ============= Metrics Collector =============
 class MetricsCollector:
+    _cache_lookups = 0
+    _cache_hits = 0
+    _row_counts_refreshed_at = 0.0
+    _row_gauges = {"users": active_users, "knowledge_bases": knowledge_bases_total}
+
     @staticmethod
     def track_document_processing(success: bool, duration: float):
         status = "success" if success else "failed"
@@ -179,26 +303,97 @@ class MetricsCollector:
             f"returned {results_count} results"
         )
     
+    @staticmethod
+    def track_rerank(duration: float, candidates_count: int):
+        rerank_duration_seconds.observe(duration)
+        logger.info(
+            f"Re-ranked {candidates_count} candidates in {duration:.4f}s"
+        )
+    
+    @staticmethod
+    def track_vector_db_call(operation: str, batch_size: int | None = None):
+        vector_db_calls_total.labels(operation=operation).inc()
+        if batch_size is not None:
+            vector_db_batch_size.labels(operation=operation).observe(batch_size)
+        calls = _vector_db_calls.get()
+        if calls is not None:
+            calls[0] += 1
+    
+    @staticmethod
+    def track_collection_cache(hit: bool):
+        collection_cache_requests_total.labels(result="hit" if hit else "miss").inc()
+    
     @staticmethod
     def track_embeddings_created(count: int):
         embeddings_created_total.inc(count)
         logger.info(f"Created {count} embeddings")
     
+    @staticmethod
+    def track_bulk_import(count: int, duration: float):
+        vectors_imported_total.inc(count)
+        rate = count / duration if duration > 0 else 0.0
+        bulk_import_throughput.observe(rate)
+        logger.info(
+            f"Imported {count} vectors in {duration:.2f}s ({rate:.0f} vectors/s)"
+        )
+        return rate
+    
+    @staticmethod
+    def track_generation(time_to_first_token: float | None, tokens: int, duration: float):
+        if time_to_first_token is not None:
+            chat_time_to_first_token_seconds.observe(time_to_first_token)
+        if tokens and duration > 0:
+            chat_tokens_per_second.observe(tokens / duration)
+        logger.info(
+            f"Generated {tokens} tokens in {duration:.3f}s"
+        )
+    
+    @classmethod
+    def track_semantic_cache(cls, hit: bool, saved_seconds: float = 0.0):
+        cls._cache_lookups += 1
+        if hit:
+            cls._cache_hits += 1
+            semantic_cache_saved_seconds_total.inc(saved_seconds)
+        semantic_cache_requests_total.labels(result="hit" if hit else "miss").inc()
+        semantic_cache_hit_ratio.set(cls._cache_hits / cls._cache_lookups)
+    
+    @staticmethod
+    def track_profile(kind: str, name: str, duration: float, samples: int):
+        profiles_captured_total.labels(kind=kind).inc()
+        logger.info(
+            f"Profiled {kind} {name}: {samples} samples over {duration:.3f}s"
+        )
+    
     @staticmethod
     def update_user_count(db):
         try:
-            count = db.query(object).count() # Placeholder
-            active_users.set(count)
+            active_users.set(estimate_row_count(db, "users"))
         except Exception as e:
             logger.error(f"Failed to update user count: {e}")
     
     @staticmethod
     def update_kb_count(db):
         try:
-            count = db.query(object).count() # Placeholder
-            knowledge_bases_total.set(count)
+            knowledge_bases_total.set(estimate_row_count(db, "knowledge_bases"))
         except Exception as e:
             logger.error(f"Failed to update KB count: {e}")
+    
+    @classmethod
+    def track_rows_created(cls, table: str, count: int = 1):
+        # Keeps the gauge current between estimate refreshes
+        gauge = cls._row_gauges.get(table)
+        if gauge is not None:
+            gauge.inc(count)
+    
+    @classmethod
+    def refresh_row_counts(cls, db, max_age: float = 30.0):
+        """Re-seed the row-count gauges from live-row statistics at most every `max_age` seconds."""
+        now = time.time()
+        if now - cls._row_counts_refreshed_at < max_age:
+            return
+        cls._row_counts_refreshed_at = now
+        cls.update_user_count(db)
+        cls.update_kb_count(db)
 
 # ============= Structured Logging =============
 class StructuredLogger:
@@ -244,7 +439,7 @@ class HealthCheck:
     
     def check_database(self) -> dict:
         try:
-            self.db.execute("SELECT 1")
+            self.db.execute(text("SELECT 1"))
             return {
                 "status": "healthy",
                 "message": "Database connection OK"
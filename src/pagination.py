@@ -0,0 +1,72 @@
+"""
+Keyset Pagination
+
+Cursor-based paging for list endpoints. Each page continues strictly after
+the last row of the previous one, using a row-value comparison on the sort
+columns, e.g.
+
+    WHERE owner_id = :owner AND (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit + 1
+
+which is a bounded index range scan at any depth, unlike OFFSET (which
+reads and discards every skipped row). The cursor is an opaque URL-safe
+token holding the last row's sort key.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+class CursorError(ValueError):
+    """Raised for cursors that cannot be decoded."""
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    """Decode a cursor and coerce its values to the columns' Python types."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return [
+            datetime.fromisoformat(v) if column.type.python_type is datetime else column.type.python_type(v)
+            for v, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError) as e:
+        raise CursorError("Invalid cursor") from e
+
+
+def keyset_page(
+    query: Query,
+    columns: list,
+    limit: int,
+    cursor: str | None = None,
+    descending: bool = True,
+) -> tuple[list, str | None]:
+    """
+    Return up to `limit` rows of `query` after `cursor`, ordered by `columns`
+    (which must form a unique key, e.g. created_at then id), plus the cursor
+    for the next page or None on the last page.
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < values if descending else key > values)
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in columns))
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in columns])
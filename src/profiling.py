@@ -0,0 +1,340 @@
+"""
+On-demand Profiling
+
+Statistical stack sampling for selected API requests and Celery tasks, so a
+slow endpoint can be inspected in production without a redeploy.
+
+A request is profiled when an admin sends the `X-Profile` header, or when
+it is picked by `PROFILING_SAMPLE_RATE`; tasks are picked by
+`PROFILING_TASK_SAMPLE_RATE`. While at least one profile is active, a
+single daemon thread reads `sys._current_frames()` every few milliseconds
+and counts collapsed stacks ("root;...;leaf count" lines), which render
+directly with flamegraph.pl, speedscope or inferno.
+
+- Task profiles sample only the thread running the task.
+- Request profiles sample every busy thread in the process (the event loop
+  and the threadpool running sync endpoints), so requests running
+  concurrently show up as well.
+
+When nothing is selected the per-request cost is one header scan, plus one
+random draw if a sample rate is set. Finished profiles are kept in a
+bounded ring buffer per process; worker profiles are also pushed to a
+capped Redis list so the API can serve them.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic_settings import BaseSettings
+
+from admission import bearer_token
+from monitoring import MetricsCollector, logger
+
+
+class ProfilingSettings(BaseSettings):
+    """Loads profiling settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    PROFILING_ENABLED: bool = True
+    # Request header that asks for a profile (honoured for admins only)
+    PROFILING_HEADER: str = "X-Profile"
+    # Fraction of requests / tasks profiled without being asked (0 = never)
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_TASK_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    # Caps the sampling overhead when many requests are selected at once
+    PROFILING_MAX_ACTIVE: int = 4
+    PROFILING_BUFFER_SIZE: int = 50
+    PROFILING_REDIS_KEY: str = "vectorvault:profiles"
+
+
+profiling_settings = ProfilingSettings()
+
+
+@dataclass(eq=False)
+class Profile:
+    kind: str  # "request" or "task"
+    name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    # Only sample this thread (None = every busy thread)
+    thread_id: int | None = None
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    stacks: Counter = field(default_factory=Counter)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 6),
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        """The profile in collapsed-stack format, heaviest stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def to_json(self) -> str:
+        return json.dumps({**self.summary(), "stacks": dict(self.stacks)})
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "Profile":
+        data = json.loads(raw)
+        return cls(
+            kind=data["kind"],
+            name=data["name"],
+            id=data["id"],
+            started_at=data["started_at"],
+            duration=data["duration"],
+            stacks=Counter(data["stacks"]),
+        )
+
+
+# ============= Stack Sampling =============
+# Leaf frames of threads parked waiting for work; those samples are dropped
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_labels: dict = {}
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+
+def collapse_stack(frame) -> str | None:
+    """Render a frame's stack root-first as 'a;b;c', or None if the thread is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StackSampler:
+    """One background thread that samples on behalf of all active profiles."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: set[Profile] = set()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: Profile):
+        # Holding the lock guarantees no sample lands after removal
+        with self._lock:
+            self._active.discard(profile)
+
+    def _sample(self, own_id: int):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = None
+            for profile in self._active:
+                if profile.thread_id is not None and profile.thread_id != thread_id:
+                    continue
+                if stack is None:
+                    stack = collapse_stack(frame) or ""
+                if stack:
+                    profile.stacks[stack] += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                self._sample(own_id)
+            time.sleep(self.interval)
+
+
+class Profiler:
+    def __init__(self, interval: float, max_active: int, buffer_size: int):
+        self.sampler = StackSampler(interval)
+        self.max_active = max_active
+        self._profiles: deque[Profile] = deque(maxlen=buffer_size)
+
+    def start(self, kind: str, name: str, thread_id: int | None = None) -> Profile | None:
+        """Begin sampling; returns None if too many profiles are already running."""
+        if self.sampler.active >= self.max_active:
+            return None
+        profile = Profile(kind=kind, name=name, thread_id=thread_id)
+        self.sampler.add(profile)
+        return profile
+
+    def finish(self, profile: Profile):
+        self.sampler.remove(profile)
+        profile.duration = time.time() - profile.started_at
+        self._profiles.append(profile)
+        MetricsCollector.track_profile(profile.kind, profile.name, profile.duration, profile.samples)
+
+    def recent(self) -> list[Profile]:
+        """Profiles finished in this process, newest first."""
+        return list(reversed(self._profiles))
+
+
+profiler = Profiler(
+    interval=profiling_settings.PROFILING_INTERVAL_SECONDS,
+    max_active=profiling_settings.PROFILING_MAX_ACTIVE,
+    buffer_size=profiling_settings.PROFILING_BUFFER_SIZE,
+)
+
+
+# ============= Worker Profiles (shared through Redis) =============
+def publish_profile(profile: Profile, redis_client=None):
+    """Push a profile onto the capped Redis list read by the API."""
+    try:
+        if redis_client is None:
+            from redis_client import get_redis
+            redis_client = get_redis()
+        pipe = redis_client.pipeline()
+        pipe.lpush(profiling_settings.PROFILING_REDIS_KEY, profile.to_json())
+        pipe.ltrim(profiling_settings.PROFILING_REDIS_KEY, 0, profiling_settings.PROFILING_BUFFER_SIZE - 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not publish profile {profile.id}: {e}")
+
+
+def worker_profiles(redis_client=None) -> list[Profile]:
+    """Profiles published by Celery workers, newest first."""
+    try:
+        if redis_client is None:
+            from redis_client import get_redis
+            redis_client = get_redis()
+        raw = redis_client.lrange(profiling_settings.PROFILING_REDIS_KEY, 0, -1)
+    except Exception as e:
+        logger.warning(f"Could not load worker profiles: {e}")
+        return []
+    return [Profile.from_json(item) for item in raw]
+
+
+def list_profiles(redis_client=None) -> list[Profile]:
+    """Profiles from this API process and from the workers, newest first."""
+    profiles = profiler.recent() + worker_profiles(redis_client)
+    return sorted(profiles, key=lambda p: p.started_at, reverse=True)
+
+
+def get_profile(profile_id: str, redis_client=None) -> Profile | None:
+    for profile in list_profiles(redis_client):
+        if profile.id == profile_id:
+            return profile
+    return None
+
+
+# ============= Celery Task Hooks =============
+_task_profiles: dict[str, Profile] = {}
+
+
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    rate = profiling_settings.PROFILING_TASK_SAMPLE_RATE
+    if not profiling_settings.PROFILING_ENABLED or not rate or random.random() >= rate:
+        return
+    profile = profiler.start("task", task.name, thread_id=threading.get_ident())
+    if profile is not None:
+        _task_profiles[task_id] = profile
+
+
+def _on_task_postrun(task_id=None, **kwargs):
+    profile = _task_profiles.pop(task_id, None)
+    if profile is not None:
+        profiler.finish(profile)
+        publish_profile(profile)
+
+
+def install_task_hooks():
+    """Connect the task profiling hooks; call once from the worker app."""
+    from celery.signals import task_postrun, task_prerun
+    task_prerun.connect(_on_task_prerun, weak=False)
+    task_postrun.connect(_on_task_postrun, weak=False)
+
+
+# ============= Middleware =============
+def _is_admin(scope) -> bool:
+    from security import is_admin_token
+    token = bearer_token(scope)
+    return bool(token) and is_admin_token(token)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+        self._header = profiling_settings.PROFILING_HEADER.lower().encode("latin-1")
+
+    def _requested(self, scope) -> bool:
+        return any(name == self._header for name, _ in scope.get("headers", []))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        requested = self._requested(scope)
+        rate = profiling_settings.PROFILING_SAMPLE_RATE
+        if not requested and not (rate and random.random() < rate):
+            await self.app(scope, receive, send)
+            return
+        # The header is only honoured for admins; everyone else is served normally
+        if requested and not await run_in_threadpool(_is_admin, scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start("request", f"{scope['method']} {scope['path']}")
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.finish(profile)
@@ -0,0 +1,221 @@
+"""
+Bulk User Provisioning
+
+Creates many users from an NDJSON stream (one {"username", "password"}
+object per line) without the per-user cost of /users/register:
+
+1. Lines are parsed as they arrive and handled in batches.
+2. Usernames repeated in the stream, and usernames that already exist
+   (one IN query per batch), are rejected before any hashing.
+3. Passwords are bcrypt-hashed in parallel in a process pool, one task
+   per slice of the batch.
+4. Each batch is written with one multi-row INSERT and one commit.
+
+Every input line gets a result (created / exists / duplicate / invalid),
+in input order. If the upload breaks a whole-request limit (too many
+users, an over-long line), reading stops there: the lines before it are
+still provisioned, and one `rejected` result marks where processing
+stopped, so the caller knows exactly which lines to resend.
+
+bcrypt dominates the cost, so throughput scales with
+PROVISION_HASH_WORKERS (one core each).
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from pydantic_settings import BaseSettings
+from sqlalchemy.orm import Session
+
+import crud, schemas, security
+from tracing import span
+
+
+class ProvisioningSettings(BaseSettings):
+    """Loads bulk-provisioning settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    PROVISION_BATCH_SIZE: int = 1000
+    # Hashing processes (0 = one per CPU)
+    PROVISION_HASH_WORKERS: int = 0
+    PROVISION_MAX_USERS: int = 100_000
+    PROVISION_MAX_LINE_BYTES: int = 4096
+
+
+provisioning_settings = ProvisioningSettings()
+
+
+class ProvisioningError(ValueError):
+    """Raised when the upload breaks a whole-request limit (e.g. too many users)."""
+
+
+# ============= Hashing Pool =============
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def hash_workers() -> int:
+    return provisioning_settings.PROVISION_HASH_WORKERS or os.cpu_count() or 1
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """The process-wide hashing pool, started on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn, not fork: the API process is multi-threaded
+                _executor = ProcessPoolExecutor(
+                    max_workers=hash_workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _forget_executor():
+    # A forked child must not reuse the parent's pool
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_executor)
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash passwords across the pool, one slice per worker; order is preserved."""
+    if not passwords:
+        return []
+    workers = hash_workers()
+    size = -(-len(passwords) // workers)
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    slices = await asyncio.gather(*(
+        loop.run_in_executor(executor, security.hash_passwords, passwords[i:i + size])
+        for i in range(0, len(passwords), size)
+    ))
+    return [hashed for part in slices for hashed in part]
+
+
+# ============= Input =============
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering the whole body."""
+    max_line = provisioning_settings.PROVISION_MAX_LINE_BYTES
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > max_line:
+                raise ProvisioningError(f"Line longer than {max_line} bytes")
+            yield line
+        # An unterminated line must not grow without bound either
+        if len(buffer) > max_line:
+            raise ProvisioningError(f"Line longer than {max_line} bytes")
+    if buffer:
+        yield buffer
+
+
+def parse_line(number: int, line: bytes) -> tuple[schemas.UserCreate | None, dict | None]:
+    """A validated user, or the 'invalid' result for the line."""
+    try:
+        return schemas.UserCreate.model_validate(json.loads(line)), None
+    except (ValueError, ValidationError) as e:
+        detail = e.errors()[0]["msg"] if isinstance(e, ValidationError) else "Invalid JSON"
+        return None, {"line": number, "username": None, "status": "invalid", "detail": detail}
+
+
+# ============= Batches =============
+async def provision_batch(db: Session, batch: list[tuple[int, schemas.UserCreate]]) -> list[dict]:
+    """Check, hash and insert one batch of (line number, user); results in input order."""
+    with span("provision.check_existing", size=len(batch)):
+        existing = await run_in_threadpool(crud.get_existing_usernames, db, [u.username for _, u in batch])
+    todo = [(number, user) for number, user in batch if user.username not in existing]
+
+    with span("provision.hash_passwords", size=len(todo)):
+        hashed = await hash_passwords([user.password for _, user in todo])
+
+    with span("provision.insert", size=len(todo)):
+        created = await run_in_threadpool(
+            crud.create_users_bulk, db, [(user.username, h) for (_, user), h in zip(todo, hashed)]
+        )
+
+    results = []
+    for number, user in batch:
+        user_id = created.get(user.username)
+        if user_id is not None:
+            results.append({"line": number, "username": user.username, "status": "created", "id": user_id})
+        else:
+            results.append({"line": number, "username": user.username, "status": "exists",
+                            "detail": "Username already registered"})
+    return results
+
+
+async def provision_users(db: Session, chunks: AsyncIterator[bytes]) -> list[dict]:
+    """
+    Provision every user in an NDJSON byte stream; one result per non-blank
+    line, or, if a limit is hit, per line before it plus a final `rejected`
+    result for the line where processing stopped.
+    """
+    batch_size = provisioning_settings.PROVISION_BATCH_SIZE
+    max_users = provisioning_settings.PROVISION_MAX_USERS
+    results: list[dict] = []
+    pending: list[tuple[int, schemas.UserCreate]] = []
+    seen: set[str] = set()
+    count = 0
+    rejected = None
+
+    number = 0
+    try:
+        async for line in iter_lines(chunks):
+            number += 1
+            if not line.strip():
+                continue
+            count += 1
+            if count > max_users:
+                raise ProvisioningError(f"At most {max_users} users per request")
+
+            user, invalid = parse_line(number, line)
+            if invalid is not None:
+                results.append(invalid)
+                continue
+            if user.username in seen:
+                results.append({"line": number, "username": user.username, "status": "duplicate",
+                                "detail": "Username repeated in this upload"})
+                continue
+            seen.add(user.username)
+            pending.append((number, user))
+            if len(pending) >= batch_size:
+                results.extend(await provision_batch(db, pending))
+                pending = []
+    except ProvisioningError as e:
+        # Earlier batches are already committed, so report them rather than
+        # failing the whole request; the rest of the body is not read.
+        stopped_at = number if count > max_users else number + 1
+        rejected = {"line": stopped_at, "username": None, "status": "rejected",
+                    "detail": f"{e}; this line and the rest were not processed"}
+
+    if pending:
+        results.extend(await provision_batch(db, pending))
+    results.sort(key=lambda r: r["line"])
+    if rejected is not None:
+        results.append(rejected)
+    return results
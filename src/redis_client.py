@@ -0,0 +1,38 @@
+"""
+Shared Redis Connection
+
+The API and the workers reuse the Celery broker's Redis for small pieces
+of shared state (tenant versions, rate limits, ...).
+"""
+
+import redis
+import redis.asyncio
+
+from celery_config import celery_settings
+
+_redis = None
+_async_redis = None
+
+
+def get_redis() -> redis.Redis:
+    """Return the process-wide Redis client (thread-safe, pooled)."""
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(
+            celery_settings.CELERY_BROKER_URL,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+        )
+    return _redis
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Return the asyncio Redis client used from ASGI middleware."""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = redis.asyncio.Redis.from_url(
+            celery_settings.CELERY_BROKER_URL,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+        )
+    return _async_redis
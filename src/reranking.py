@@ -0,0 +1,96 @@
+"""
+Re-ranking
+
+Maximal marginal relevance (MMR) over retrieved candidates, so the final
+context trades a little relevance for a lot less redundancy. Works on a
+batch of queries at once; each selection step is a handful of NumPy ops
+over the whole (batch, candidates) matrix.
+"""
+
+import numpy as np
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def mmr_batch(
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    groups: np.ndarray | None = None,
+    per_group_cap: int | None = None,
+    valid: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Select up to `k` candidates per query by maximal marginal relevance.
+
+    queries:    (B, d) query embeddings
+    candidates: (B, N, d) candidate embeddings
+    groups:     optional (B, N) integer group (e.g. document) per candidate;
+                with `per_group_cap`, at most that many picks per group
+    valid:      optional (B, N) mask of real candidates (for padded batches)
+
+    Returns a (B, k) array of candidate indices, padded with -1 when fewer
+    than `k` candidates are selectable.
+    """
+    queries = _normalize(np.asarray(queries, dtype=np.float32))
+    candidates = _normalize(np.asarray(candidates, dtype=np.float32))
+    batch, n, _ = candidates.shape
+    k = min(k, n)
+
+    relevance = np.einsum("bnd,bd->bn", candidates, queries)
+    max_similarity = np.full((batch, n), -np.inf, dtype=np.float32)
+    available = np.ones((batch, n), dtype=bool) if valid is None else np.asarray(valid, dtype=bool).copy()
+    group_counts = np.zeros((batch, n), dtype=np.int32)
+    rows = np.arange(batch)
+    selected = np.full((batch, k), -1, dtype=np.int64)
+
+    for step in range(k):
+        # No redundancy penalty until something has been selected
+        penalty = np.where(np.isinf(max_similarity), 0.0, max_similarity)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * penalty
+        scores = np.where(available, scores, -np.inf)
+
+        pick = np.argmax(scores, axis=1)
+        ok = np.isfinite(scores[rows, pick])
+        if not ok.any():
+            break
+        selected[ok, step] = pick[ok]
+        available[rows[ok], pick[ok]] = False
+
+        picked = candidates[rows, pick]  # (B, d)
+        similarity = np.einsum("bnd,bd->bn", candidates, picked)
+        max_similarity = np.where(ok[:, None], np.maximum(max_similarity, similarity), max_similarity)
+
+        if groups is not None and per_group_cap:
+            same_group = (groups == groups[rows, pick][:, None]) & ok[:, None]
+            group_counts += same_group
+            available &= group_counts < per_group_cap
+
+    return selected
+
+
+def mmr(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    groups: np.ndarray | None = None,
+    per_group_cap: int | None = None,
+) -> list[int]:
+    """Single-query MMR; returns selected candidate indices in order."""
+    if len(candidates) == 0:
+        return []
+    selected = mmr_batch(
+        query[None, :],
+        np.asarray(candidates)[None, :, :],
+        k,
+        lambda_mult=lambda_mult,
+        groups=None if groups is None else np.asarray(groups)[None, :],
+        per_group_cap=per_group_cap,
+    )[0]
+    return [int(i) for i in selected if i >= 0]
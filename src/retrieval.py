@@ -0,0 +1,131 @@
+"""
+Retrieval
+
+The query path behind /search and /chat: fetch the nearest chunks for a
+query from the tenant's collection, then optionally diversify them with
+MMR re-ranking.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from pydantic_settings import BaseSettings
+
+from monitoring import MetricsCollector
+from reranking import mmr
+from vector_store import embed_texts, get_tenant_collection
+
+
+class RetrievalSettings(BaseSettings):
+    """Loads retrieval settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    MMR_ENABLED: bool = True
+    MMR_LAMBDA: float = 0.5
+    # Candidates fetched from the vector DB before re-ranking down to k
+    MMR_CANDIDATES: int = 20
+    # Max chunks per source document in the final result (0 = no cap)
+    MMR_PER_DOCUMENT_CAP: int = 0
+
+
+retrieval_settings = RetrievalSettings()
+
+
+@dataclass
+class RetrievedChunk:
+    id: str
+    document: str | None
+    distance: float
+    metadata: dict = field(default_factory=dict)
+    embedding: np.ndarray | None = None
+
+
+def retrieve(
+    owner_id: int,
+    query: str,
+    k: int,
+    query_embedding: np.ndarray | None = None,
+    mmr_lambda: float | None = None,
+    candidates: int | None = None,
+    include_embeddings: bool = False,
+) -> list[RetrievedChunk]:
+    """
+    Return up to `k` chunks for `query` from the tenant's collection.
+
+    Pass `query_embedding` when the caller has already embedded the query.
+    With MMR enabled, a larger candidate pool is fetched and re-ranked for
+    diversity; `mmr_lambda` and `candidates` override the settings.
+    """
+    use_mmr = retrieval_settings.MMR_ENABLED
+    pool = max(k, candidates or retrieval_settings.MMR_CANDIDATES) if use_mmr else k
+    if use_mmr and query_embedding is None:
+        query_embedding = embed_texts([query])[0]
+
+    include = ["documents", "metadatas", "distances"]
+    if use_mmr or include_embeddings:
+        include.append("embeddings")
+    if query_embedding is not None:
+        target = {"query_embeddings": [np.asarray(query_embedding).tolist()]}
+    else:
+        target = {"query_texts": [query]}
+
+    collection = get_tenant_collection(owner_id)
+    start_time = time.time()
+    result = collection.query(**target, n_results=pool, include=include)
+    embeddings = result["embeddings"][0] if "embeddings" in include else None
+    chunks = [
+        RetrievedChunk(
+            id=result["ids"][0][i],
+            document=result["documents"][0][i],
+            distance=result["distances"][0][i],
+            metadata=result["metadatas"][0][i] or {},
+            embedding=np.asarray(embeddings[i], dtype=np.float32) if embeddings is not None else None,
+        )
+        for i in range(len(result["ids"][0]))
+    ]
+    MetricsCollector.track_vector_search(time.time() - start_time, len(chunks))
+
+    if use_mmr and len(chunks) > 1:
+        chunks = rerank(
+            query_embedding,
+            chunks,
+            k,
+            mmr_lambda if mmr_lambda is not None else retrieval_settings.MMR_LAMBDA,
+            retrieval_settings.MMR_PER_DOCUMENT_CAP or None,
+        )
+
+    if not include_embeddings:
+        for chunk in chunks:
+            chunk.embedding = None
+    return chunks[:k]
+
+
+def rerank(
+    query_embedding: np.ndarray,
+    chunks: list[RetrievedChunk],
+    k: int,
+    lambda_mult: float,
+    per_document_cap: int | None = None,
+) -> list[RetrievedChunk]:
+    """Diversify `chunks` with MMR, capping chunks per `document_id`."""
+    start_time = time.time()
+    groups = None
+    if per_document_cap:
+        ids: dict = {}
+        groups = np.array([
+            ids.setdefault(c.metadata.get("document_id", c.id), len(ids)) for c in chunks
+        ])
+    order = mmr(
+        np.asarray(query_embedding, dtype=np.float32),
+        np.stack([c.embedding for c in chunks]),
+        k,
+        lambda_mult=lambda_mult,
+        groups=groups,
+        per_group_cap=per_document_cap,
+    )
+    MetricsCollector.track_rerank(time.time() - start_time, len(chunks))
+    return [chunks[i] for i in order]
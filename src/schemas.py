@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Generic, Literal, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
 
 # --- Token Schemas ---
 class Token(BaseModel):
@@ -22,4 +27,120 @@ class UserRead(UserBase):
     is_active: bool
 
     class Config:
-        from_attributes = True # Replaces orm_mode = True
\ No newline at end of file
+        from_attributes = True # Replaces orm_mode = True
+
+# --- Pagination Schemas ---
+class Page(BaseModel, Generic[T]):
+    """One page of a keyset-paginated listing."""
+    items: list[T]
+    # Pass as `cursor` to get the next page; null on the last page
+    next_cursor: str | None = None
+
+# --- Knowledge Base Schemas ---
+class KnowledgeBaseCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=200)
+    description: str | None = None
+
+class KnowledgeBaseRead(KnowledgeBaseCreate):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DocumentRead(BaseModel):
+    id: int
+    knowledge_base_id: int
+    filename: str
+    status: str
+    chunk_count: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ChunkRead(BaseModel):
+    id: int
+    index: int
+    text: str
+    token_count: int
+    page_start: int | None
+    page_end: int | None
+
+    class Config:
+        from_attributes = True
+
+# --- Bulk Import Schemas ---
+class BulkImportAccepted(BaseModel):
+    """Returned when a bulk import has been validated and queued."""
+    task_id: str
+    count: int
+    dimension: int
+
+
+# --- Snapshot Schemas ---
+class SnapshotRequest(BaseModel):
+    quantize: bool = False
+
+class SnapshotRead(BaseModel):
+    snapshot_id: str
+    created_at: str
+    count: int
+    dimension: int
+    dtype: str
+
+class TaskAccepted(BaseModel):
+    task_id: str
+
+
+# --- Chat Schemas ---
+class ChatRequest(BaseModel):
+    query: str = Field(min_length=1)
+    top_k: int | None = Field(default=None, ge=1, le=50)
+
+
+# --- Search Schemas ---
+class SearchRequest(BaseModel):
+    query: str = Field(min_length=1)
+    top_k: int = Field(default=10, ge=1, le=100)
+    vector_encoding: Literal["none", "json", "base64"] = "none"
+
+class SearchResult(BaseModel):
+    id: str
+    document: str | None
+    distance: float
+    metadata: dict
+    # list of floats for "json", base64 float32 (little-endian) for "base64"
+    embedding: list[float] | str | None = None
+
+class SearchResponse(BaseModel):
+    results: list[SearchResult]
+    vector_encoding: str
+
+
+# --- Profiling Schemas ---
+class ProfileSummary(BaseModel):
+    id: str
+    kind: str
+    name: str
+    started_at: float
+    duration: float
+    samples: int
+
+
+# --- Bulk Provisioning Schemas ---
+class BulkUserResult(BaseModel):
+    line: int
+    username: str | None
+    status: Literal["created", "exists", "duplicate", "invalid", "rejected"]
+    id: int | None = None
+    detail: str | None = None
+
+class BulkProvisionResponse(BaseModel):
+    created: int
+    exists: int
+    duplicate: int
+    invalid: int
+    # 1 if a whole-request limit stopped processing (see the last result)
+    rejected: int
+    results: list[BulkUserResult]
@@ -6,21 +6,31 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 import crud, models, schemas
-from database import get_db, settings
+from tracing import traced
+from database import get_db, settings, SessionLocal
 
 # --- Password Hashing Setup ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # --- Password Utilities ---
+@traced("security.verify_password")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Check if a plain password matches a hashed password."""
     return pwd_context.verify(plain_password, hashed_password)
 
+@traced("security.hash_password")
 def get_password_hash(password: str) -> str:
     """Generate a hash for a plain password."""
     return pwd_context.hash(password)
 
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash a batch of passwords. Runs in worker processes for bulk
+    provisioning, so it is a plain module-level function (picklable, untraced).
+    """
+    return [pwd_context.hash(password) for password in passwords]
+
 # --- JWT Token Utilities ---
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """Create a new JWT access token."""
@@ -53,6 +63,7 @@ def authenticate_user(db: Session, username: str, password: str) -> models.User
         return None
     return user
 
+@traced("security.get_current_user")
 def get_current_user(
     token: str = Depends(oauth2_scheme), 
     db: Session = Depends(get_db)
@@ -108,4 +119,37 @@ def get_current_active_user(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Inactive user"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_current_admin_user(
+    current_user: models.User = Depends(get_current_active_user)
+) -> models.User:
+    """
+    Check if the current user is an admin.
+    Used to protect operational endpoints.
+    """
+    if not current_user.is_admin: # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+def is_admin_token(token: str) -> bool:
+    """
+    Check a raw JWT outside of a request dependency (e.g. in middleware).
+    True only for a valid token of an active admin user.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return False
+    username = payload.get("sub")
+    if username is None:
+        return False
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_username(db, username=username)
+        return bool(user and user.is_active and user.is_admin)
+    finally:
+        db.close()
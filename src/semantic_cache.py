@@ -0,0 +1,211 @@
+"""
+Semantic Answer Cache
+
+Per-tenant cache of generated answers keyed by query embedding. A new
+query is served from the cache when its cosine similarity to a cached
+query exceeds a threshold, it asks for the same answer parameters
+(top_k and generator backend), and the tenant's documents have not
+changed since the answer was generated.
+
+Each tenant's entries live in one contiguous float32 matrix, so a lookup
+is a single matrix-vector product. Eviction is LRU via a per-entry access clock.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from pydantic_settings import BaseSettings
+
+from monitoring import MetricsCollector, logger
+from redis_client import get_redis
+
+
+class SemanticCacheSettings(BaseSettings):
+    """Loads semantic-cache settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000  # per tenant
+    SEMANTIC_CACHE_MAX_TENANTS: int = 1000
+
+
+cache_settings = SemanticCacheSettings()
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    sources: list[dict]
+    latency: float  # seconds the original retrieval + generation took
+    top_k: int
+    backend: str
+    similarity: float = 0.0
+
+
+# ============= Tenant Versions =============
+def _version_key(owner_id: int) -> str:
+    return f"vectorvault:tenant:{owner_id}:version"
+
+
+def tenant_version(owner_id: int) -> int | None:
+    """
+    Current version of a tenant's documents, or None if Redis is down
+    (callers should then bypass the cache, since staleness can't be ruled out).
+    """
+    try:
+        return int(get_redis().get(_version_key(owner_id)) or 0)
+    except Exception as e:
+        logger.warning(f"Could not read tenant version: {e}")
+        return None
+
+
+def bump_tenant_version(owner_id: int):
+    """Mark a tenant's documents as changed; called after every write."""
+    try:
+        get_redis().incr(_version_key(owner_id))
+    except Exception as e:
+        logger.error(f"Could not bump tenant version: {e}")
+
+
+# ============= Cache =============
+class _TenantCache:
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, dimension: int, version: int):
+        self.version = version
+        self.embeddings = np.zeros((self.INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self.last_used = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        # Small integer per distinct (top_k, backend), so matching is vectorized too
+        self.variants = np.zeros(self.INITIAL_CAPACITY, dtype=np.int32)
+        self.variant_ids: dict[tuple[int, str], int] = {}
+        self.entries: list[CachedAnswer] = []
+
+    def variant_id(self, top_k: int, backend: str) -> int:
+        return self.variant_ids.setdefault((top_k, backend), len(self.variant_ids))
+
+    def grow(self, max_entries: int):
+        capacity = min(max_entries, 2 * len(self.embeddings))
+        embeddings = np.zeros((capacity, self.embeddings.shape[1]), dtype=np.float32)
+        embeddings[:len(self.entries)] = self.embeddings[:len(self.entries)]
+        last_used = np.zeros(capacity, dtype=np.int64)
+        last_used[:len(self.entries)] = self.last_used[:len(self.entries)]
+        variants = np.zeros(capacity, dtype=np.int32)
+        variants[:len(self.entries)] = self.variants[:len(self.entries)]
+        self.embeddings, self.last_used, self.variants = embeddings, last_used, variants
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        threshold: float | None = None,
+        max_entries: int | None = None,
+        max_tenants: int | None = None,
+    ):
+        self.threshold = threshold if threshold is not None else cache_settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = max_entries or cache_settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.max_tenants = max_tenants or cache_settings.SEMANTIC_CACHE_MAX_TENANTS
+        self._tenants: OrderedDict[int, _TenantCache] = OrderedDict()
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _tenant(self, owner_id: int, version: int) -> _TenantCache | None:
+        tenant = self._tenants.get(owner_id)
+        if tenant is None:
+            return None
+        if tenant.version < version:
+            # The tenant's documents changed since these entries were stored
+            del self._tenants[owner_id]
+            return None
+        if tenant.version > version:
+            # The caller read the version before a concurrent bump
+            return None
+        self._tenants.move_to_end(owner_id)
+        return tenant
+
+    def lookup(
+        self,
+        owner_id: int,
+        embedding: np.ndarray,
+        version: int,
+        top_k: int,
+        backend: str,
+    ) -> CachedAnswer | None:
+        start_time = time.perf_counter()
+        query = self._normalize(embedding)
+        hit = None
+        with self._lock:
+            tenant = self._tenant(owner_id, version)
+            variant = tenant.variant_ids.get((top_k, backend)) if tenant is not None else None
+            if variant is not None and tenant.embeddings.shape[1] == query.shape[0]:
+                n = len(tenant.entries)
+                similarities = np.where(tenant.variants[:n] == variant, tenant.embeddings[:n] @ query, -np.inf)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._clock += 1
+                    tenant.last_used[best] = self._clock
+                    entry = tenant.entries[best]
+                    hit = CachedAnswer(
+                        entry.answer, entry.sources, entry.latency, entry.top_k, entry.backend,
+                        similarity=float(similarities[best]),
+                    )
+
+        lookup_time = time.perf_counter() - start_time
+        MetricsCollector.track_semantic_cache(
+            hit=hit is not None,
+            saved_seconds=max(0.0, hit.latency - lookup_time) if hit else 0.0,
+        )
+        return hit
+
+    def store(
+        self,
+        owner_id: int,
+        embedding: np.ndarray,
+        version: int,
+        answer: str,
+        sources: list[dict],
+        latency: float,
+        top_k: int,
+        backend: str,
+    ):
+        query = self._normalize(embedding)
+        entry = CachedAnswer(answer=answer, sources=sources, latency=latency, top_k=top_k, backend=backend)
+        with self._lock:
+            current = self._tenants.get(owner_id)
+            if current is not None and current.version > version:
+                # Generated before an import/restore bumped the version:
+                # stale, and must not displace the newer entries
+                return
+            tenant = self._tenant(owner_id, version)
+            if tenant is None or tenant.embeddings.shape[1] != query.shape[0]:
+                tenant = _TenantCache(query.shape[0], version)
+                self._tenants[owner_id] = tenant
+                while len(self._tenants) > self.max_tenants:
+                    self._tenants.popitem(last=False)
+
+            if len(tenant.entries) < self.max_entries:
+                if len(tenant.entries) == len(tenant.embeddings):
+                    tenant.grow(self.max_entries)
+                slot = len(tenant.entries)
+                tenant.entries.append(entry)
+            else:
+                slot = int(np.argmin(tenant.last_used[:len(tenant.entries)]))
+                tenant.entries[slot] = entry
+            self._clock += 1
+            tenant.embeddings[slot] = query
+            tenant.last_used[slot] = self._clock
+            tenant.variants[slot] = tenant.variant_id(top_k, backend)
+
+answer_cache = SemanticCache()
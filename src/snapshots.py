@@ -0,0 +1,359 @@
+"""
+Tenant Vector Snapshots
+
+Compact, memory-mappable snapshots of a tenant's collection, so a tenant
+can be restored or a new node warmed without re-embedding anything.
+
+Snapshot layout (one directory per snapshot):
+    manifest.json       - counts, dtype and a SHA-256 of every other file
+    vectors.npy         - (n, d) float32, or int8 when quantized
+    scales.npy          - (n,) float32 per-vector scales (quantized only)
+    ids.bin             - UTF-8 IDs, concatenated
+    id_offsets.npy      - (n + 1,) int64 offsets into ids.bin
+    metadata.bin        - one compact JSON object per row, concatenated
+                          (empty for rows without metadata)
+    metadata_offsets.npy - (n + 1,) int64 offsets into metadata.bin
+    documents.bin       - UTF-8 document text per row, concatenated
+                          (empty for rows without a document)
+    document_offsets.npy - (n + 1,) int64 offsets into documents.bin
+
+Every file is written and read one batch at a time; nothing is ever
+loaded whole. Metadata is stored per row rather than per key: rows are
+what an upsert batch needs, and an offset index lets a batch be decoded
+without touching the rest of the file.
+"""
+
+import hashlib
+import json
+import re
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+
+from vector_store import vector_settings
+
+FORMAT_VERSION = 3
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_SNAPSHOT_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be written, found or verified."""
+
+
+@dataclass
+class Snapshot:
+    """A snapshot opened for reading. Arrays are memory-mapped."""
+    path: Path
+    manifest: dict
+    vectors: np.ndarray
+    scales: np.ndarray | None
+    id_offsets: np.ndarray
+    id_blob: np.ndarray
+    metadata_offsets: np.ndarray
+    metadata_blob: np.ndarray
+    document_offsets: np.ndarray
+    document_blob: np.ndarray
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def ids(self, start: int, stop: int) -> list[str]:
+        return [row.decode("utf-8") for row in _rows(self.id_offsets, self.id_blob, start, stop)]
+
+    def embeddings(self, start: int, stop: int) -> np.ndarray:
+        block = np.asarray(self.vectors[start:stop])
+        if self.scales is None:
+            return block
+        return block.astype(np.float32) * self.scales[start:stop, None]
+
+    def metadatas(self, start: int, stop: int) -> list[dict | None] | None:
+        # Rows without metadata stay None: Chroma rejects empty dicts
+        rows = [
+            json.loads(row) if row else None
+            for row in _rows(self.metadata_offsets, self.metadata_blob, start, stop)
+        ]
+        return rows if any(row is not None for row in rows) else None
+
+    def documents(self, start: int, stop: int) -> list[str | None] | None:
+        rows = [
+            row.decode("utf-8") if row else None
+            for row in _rows(self.document_offsets, self.document_blob, start, stop)
+        ]
+        return rows if any(row is not None for row in rows) else None
+
+    def iter_batches(
+        self,
+        batch_size: int,
+    ) -> Iterator[tuple[list, np.ndarray, list | None, list | None]]:
+        """Yield (ids, embeddings, metadatas, documents) batches."""
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            yield (
+                self.ids(start, stop),
+                self.embeddings(start, stop),
+                self.metadatas(start, stop),
+                self.documents(start, stop),
+            )
+
+    def id_hashes(self, batch_size: int = 100_000) -> np.ndarray:
+        """Sorted 64-bit hashes of every ID (8 bytes per row), for membership tests."""
+        hashes = np.empty(len(self), dtype=np.uint64)
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            hashes[start:stop] = _hash_ids(_rows(self.id_offsets, self.id_blob, start, stop))
+        hashes.sort()
+        return hashes
+
+
+def _rows(offsets: np.ndarray, blob: np.ndarray, start: int, stop: int) -> list[bytes]:
+    """Rows start..stop of an offset-indexed blob, reading only their bytes."""
+    offsets = offsets[start:stop + 1]
+    if len(offsets) < 2:
+        return []
+    data = blob[offsets[0]:offsets[-1]].tobytes()
+    base = offsets[0]
+    return [data[a - base:b - base] for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def _hash_ids(ids: list[bytes]) -> np.ndarray:
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(i, digest_size=8).digest(), "little") for i in ids),
+        dtype=np.uint64,
+        count=len(ids),
+    )
+
+
+def _append_rows(file, offsets: np.ndarray, start: int, rows: list[bytes]):
+    """Write rows to an offset-indexed blob, filling offsets[start + 1:start + len(rows) + 1]."""
+    offsets[start + 1:start + len(rows) + 1] = offsets[start] + np.cumsum([len(r) for r in rows])
+    file.write(b"".join(rows))
+
+
+# ============= Paths =============
+def tenant_snapshot_dir(owner_id: int) -> Path:
+    return Path(vector_settings.DATA_DIR) / "snapshots" / str(owner_id)
+
+
+def snapshot_path(owner_id: int, snapshot_id: str) -> Path:
+    if not _SNAPSHOT_ID_RE.match(snapshot_id):
+        raise SnapshotError(f"Invalid snapshot id: {snapshot_id}")
+    return tenant_snapshot_dir(owner_id) / snapshot_id
+
+
+def list_snapshots(owner_id: int) -> list[dict]:
+    """Return the manifests of a tenant's snapshots, newest first."""
+    root = tenant_snapshot_dir(owner_id)
+    if not root.exists():
+        return []
+    manifests = []
+    for manifest_file in sorted(root.glob("*/manifest.json"), reverse=True):
+        with open(manifest_file) as f:
+            manifests.append(json.load(f))
+    return manifests
+
+
+# ============= Checksums =============
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============= Quantization =============
+def quantize_int8(block: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization."""
+    scales = np.abs(block).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.rint(block / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+# ============= Export =============
+def export_collection(
+    collection,
+    owner_id: int,
+    quantize: bool = False,
+    batch_size: int = 5000,
+) -> dict:
+    """
+    Stream a collection to a new snapshot directory and return its manifest.
+
+    Vectors are written straight into a memory-mapped `.npy` file one batch
+    at a time; the manifest is written last, so a snapshot without one is
+    incomplete and is ignored by `list_snapshots`.
+    """
+    count = collection.count()
+    created_at = datetime.now(timezone.utc)
+    snapshot_id = f"{created_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    path = snapshot_path(owner_id, snapshot_id)
+    path.mkdir(parents=True)
+
+    try:
+        vectors = scales = None
+        dimension = 0
+        id_offsets = np.zeros(count + 1, dtype=np.int64)
+        metadata_offsets = np.zeros(count + 1, dtype=np.int64)
+        document_offsets = np.zeros(count + 1, dtype=np.int64)
+        written = 0
+
+        with (
+            open(path / "ids.bin", "wb") as id_file,
+            open(path / "metadata.bin", "wb") as metadata_file,
+            open(path / "documents.bin", "wb") as document_file,
+        ):
+            while written < count:
+                page = collection.get(
+                    include=["embeddings", "metadatas", "documents"],
+                    limit=batch_size,
+                    offset=written,
+                )
+                if not page["ids"]:
+                    break
+                block = np.asarray(page["embeddings"], dtype=np.float32)
+                n = len(page["ids"])
+                if written + n > count:
+                    raise SnapshotError("Collection grew during export")
+
+                if vectors is None:
+                    dimension = block.shape[1]
+                    dtype = np.int8 if quantize else np.float32
+                    vectors = np.lib.format.open_memmap(
+                        path / "vectors.npy", mode="w+", dtype=dtype, shape=(count, dimension)
+                    )
+                    if quantize:
+                        scales = np.lib.format.open_memmap(
+                            path / "scales.npy", mode="w+", dtype=np.float32, shape=(count,)
+                        )
+
+                if quantize:
+                    vectors[written:written + n], scales[written:written + n] = quantize_int8(block)
+                else:
+                    vectors[written:written + n] = block
+
+                _append_rows(id_file, id_offsets, written, [i.encode("utf-8") for i in page["ids"]])
+                _append_rows(metadata_file, metadata_offsets, written, [
+                    json.dumps(meta, separators=(",", ":")).encode("utf-8") if meta else b""
+                    for meta in page["metadatas"] or [None] * n
+                ])
+                _append_rows(document_file, document_offsets, written, [
+                    doc.encode("utf-8") if doc else b""
+                    for doc in page.get("documents") or [None] * n
+                ])
+                written += n
+
+        if written != count:
+            raise SnapshotError(f"Collection changed during export ({written}/{count} rows)")
+
+        if vectors is None:
+            # Empty collection: nothing to memory-map
+            np.save(path / "vectors.npy", np.zeros((0, 0), dtype=np.int8 if quantize else np.float32))
+            if quantize:
+                np.save(path / "scales.npy", np.zeros(0, dtype=np.float32))
+        else:
+            vectors.flush()
+            if scales is not None:
+                scales.flush()
+        del vectors, scales
+        np.save(path / "id_offsets.npy", id_offsets)
+        np.save(path / "metadata_offsets.npy", metadata_offsets)
+        np.save(path / "document_offsets.npy", document_offsets)
+
+        files = sorted(p.name for p in path.iterdir())
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "snapshot_id": snapshot_id,
+            "owner_id": owner_id,
+            "created_at": created_at.isoformat(),
+            "count": count,
+            "dimension": dimension,
+            "dtype": "int8" if quantize else "float32",
+            "files": {name: file_sha256(path / name) for name in files},
+        }
+        with open(path / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    return manifest
+
+
+# ============= Restore =============
+def _map_bytes(path: Path) -> np.ndarray:
+    # mmap refuses empty files
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def open_snapshot(owner_id: int, snapshot_id: str, verify: bool = True) -> Snapshot:
+    """Open a snapshot with memory-mapped arrays, verifying checksums first."""
+    path = snapshot_path(owner_id, snapshot_id)
+    manifest_file = path / "manifest.json"
+    if not manifest_file.exists():
+        raise SnapshotError(f"Snapshot {snapshot_id} not found")
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format_version')}")
+
+    if verify:
+        for name, expected in manifest["files"].items():
+            if file_sha256(path / name) != expected:
+                raise SnapshotError(f"Checksum mismatch for {name}")
+
+    quantized = manifest["dtype"] == "int8"
+    return Snapshot(
+        path=path,
+        manifest=manifest,
+        vectors=np.load(path / "vectors.npy", mmap_mode="r"),
+        scales=np.load(path / "scales.npy", mmap_mode="r") if quantized else None,
+        id_offsets=np.load(path / "id_offsets.npy", mmap_mode="r"),
+        id_blob=_map_bytes(path / "ids.bin"),
+        metadata_offsets=np.load(path / "metadata_offsets.npy", mmap_mode="r"),
+        metadata_blob=_map_bytes(path / "metadata.bin"),
+        document_offsets=np.load(path / "document_offsets.npy", mmap_mode="r"),
+        document_blob=_map_bytes(path / "documents.bin"),
+    )
+
+
+def prune_to_snapshot(
+    collection,
+    snapshot: Snapshot,
+    delete: Callable[[list[str]], object],
+    batch_size: int = 5000,
+) -> int:
+    """
+    Delete every record of `collection` whose ID is not in `snapshot`, by
+    calling `delete(ids)` one page at a time; returns how many were removed.
+    Run after upserting the snapshot, so the collection ends in exactly the
+    snapshot's state without ever being empty in between.
+    """
+    keep = snapshot.id_hashes()
+    removed = 0
+    offset = 0
+    while True:
+        page = collection.get(include=[], limit=batch_size, offset=offset)
+        ids = page["ids"]
+        if not ids:
+            break
+        hashes = _hash_ids([i.encode("utf-8") for i in ids])
+        positions = np.minimum(np.searchsorted(keep, hashes), max(len(keep) - 1, 0))
+        found = keep[positions] == hashes if len(keep) else np.zeros(len(ids), dtype=bool)
+        stale = [i for i, known in zip(ids, found) if not known]
+        if stale:
+            delete(stale)
+            removed += len(stale)
+        # Deleted rows no longer occupy offsets
+        offset += len(ids) - len(stale)
+    return removed
@@ -1,5 +1,12 @@
 import time
+from itertools import islice
 from celery_worker import celery_app
+import bulk_import, crud, semantic_cache, snapshots, vector_store
+from database import SessionLocal
+from chunking import iter_chunks, iter_pdf_pages
+from monitoring import MetricsCollector
+from tracing import span
+from vector_store import chunk_vector_id, get_tenant_collection, vector_settings
 
 @celery_app.task(name="create_hello_world_task")
 def create_hello_world_task(message: str):
@@ -7,10 +14,183 @@ def create_hello_world_task(message: str):
     A simple test task that simulates a long-running job.
     """
     print(f"Received job: {message}")
-    
+
     # Simulate a slow process like processing a PDF
-    time.sleep(10) 
-    
+    time.sleep(10)
+
     result = f"Task completed! You said: {message}"
     print(result)
-    return result
\ No newline at end of file
+    return result
+
+
+@celery_app.task(name="process_document_task")
+def process_document_task(
+    file_path: str,
+    owner_id: int,
+    document_id: int,
+    max_tokens: int = 512,
+    overlap_tokens: int = 64,
+):
+    """
+    Parse a PDF page by page, split it into overlapping chunks, and store
+    them batch by batch: chunk rows in the database, embeddings in the
+    tenant's collection. Neither the document text nor its full chunk list
+    is ever held in memory.
+    """
+    start_time = time.time()
+    chunk_count = 0
+    token_count = 0
+    db = SessionLocal()
+    try:
+        crud.set_document_status(db, document_id, "processing")
+        # Re-ingesting replaces the previous chunks; their vector IDs are
+        # reused by index, so only a surplus of old ones needs deleting.
+        # The row delete commits with the first new batch (or rolls back).
+        previous = crud.delete_chunks(db, document_id)
+
+        chunks = iter_chunks(iter_pdf_pages(file_path), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        batch_size = vector_settings.INGEST_BATCH_SIZE
+        while True:
+            # Parsing and chunking are interleaved (both stream), so one stage
+            with span("ingest.parse_and_chunk", owner_id=owner_id):
+                batch = list(islice(chunks, batch_size))
+            if not batch:
+                break
+
+            texts = [chunk.text for chunk in batch]
+            with span("ingest.embed", size=len(batch)):
+                embeddings = vector_store.embed_texts(texts)
+            with span("ingest.upsert_batch", size=len(batch)):
+                vector_store.upsert(
+                    owner_id,
+                    [chunk_vector_id(document_id, chunk.index) for chunk in batch],
+                    embeddings,
+                    [
+                        {
+                            "document_id": document_id,
+                            "chunk_index": chunk.index,
+                            "page_start": chunk.page_start,
+                            "page_end": chunk.page_end,
+                        }
+                        for chunk in batch
+                    ],
+                    texts,
+                )
+            with span("ingest.store_chunks", size=len(batch)):
+                crud.add_chunks(db, owner_id, document_id, batch)
+            chunk_count += len(batch)
+            token_count += sum(chunk.token_count for chunk in batch)
+
+        if previous > chunk_count:
+            vector_store.delete(owner_id, [chunk_vector_id(document_id, i) for i in range(chunk_count, previous)])
+        crud.set_document_status(db, document_id, "ready", chunk_count)
+    except Exception:
+        db.rollback()
+        crud.set_document_status(db, document_id, "failed")
+        MetricsCollector.track_document_processing(False, time.time() - start_time)
+        raise
+    finally:
+        db.close()
+        if chunk_count:
+            with span("cache.bump_tenant_version"):
+                semantic_cache.bump_tenant_version(owner_id)
+
+    MetricsCollector.track_document_processing(True, time.time() - start_time)
+    return {
+        "file_path": file_path,
+        "owner_id": owner_id,
+        "document_id": document_id,
+        "chunks": chunk_count,
+        "tokens": token_count,
+    }
+
+
+@celery_app.task(name="import_vectors_task")
+def import_vectors_task(job_dir: str, owner_id: int, batch_size: int | None = None):
+    """
+    Write a staged bulk import into the tenant's collection in large batches.
+    """
+    batch_size = batch_size or vector_settings.IMPORT_BATCH_SIZE
+
+    start_time = time.time()
+    imported = 0
+    try:
+        for ids, vectors, metadatas in bulk_import.iter_batches(job_dir, batch_size):
+            with span("import.upsert_batch", size=len(ids)):
+                imported += vector_store.upsert(owner_id, ids, vectors, metadatas, batch_size=batch_size)
+    finally:
+        bulk_import.discard(job_dir)
+        if imported:
+            with span("cache.bump_tenant_version"):
+                semantic_cache.bump_tenant_version(owner_id)
+
+    duration = time.time() - start_time
+    rate = MetricsCollector.track_bulk_import(imported, duration)
+    return {
+        "owner_id": owner_id,
+        "imported": imported,
+        "seconds": round(duration, 3),
+        "vectors_per_second": round(rate, 1),
+    }
+
+
+# --- Maintenance Tasks ---
+
+@celery_app.task(name="export_snapshot_task")
+def export_snapshot_task(owner_id: int, quantize: bool = False):
+    """
+    Stream the tenant's collection into a checksummed binary snapshot.
+    """
+    start_time = time.time()
+    with span("snapshot.export", quantize=quantize):
+        manifest = snapshots.export_collection(
+            get_tenant_collection(owner_id),
+            owner_id,
+            quantize=quantize,
+            batch_size=vector_settings.SNAPSHOT_BATCH_SIZE,
+        )
+    print(f"Exported {manifest['count']} vectors for user {owner_id} in {time.time() - start_time:.2f}s")
+    return manifest
+
+
+@celery_app.task(name="restore_snapshot_task")
+def restore_snapshot_task(owner_id: int, snapshot_id: str):
+    """
+    Verify a snapshot and restore the tenant's collection to its state:
+    every snapshot record is upserted, then records not in the snapshot are
+    deleted. The collection is never emptied, so searches keep working
+    (over a mix of old and restored records) while a restore runs.
+    """
+    start_time = time.time()
+    with span("snapshot.verify"):
+        snapshot = snapshots.open_snapshot(owner_id, snapshot_id)
+
+    restored = 0
+    removed = 0
+    batch_size = vector_settings.SNAPSHOT_BATCH_SIZE
+    try:
+        for ids, vectors, metadatas, documents in snapshot.iter_batches(batch_size):
+            with span("snapshot.upsert_batch", size=len(ids)):
+                restored += vector_store.upsert(owner_id, ids, vectors, metadatas, documents, batch_size=batch_size)
+        with span("snapshot.prune"):
+            removed = snapshots.prune_to_snapshot(
+                get_tenant_collection(owner_id),
+                snapshot,
+                lambda stale: vector_store.delete(owner_id, stale, batch_size=batch_size),
+                batch_size=batch_size,
+            )
+    finally:
+        # Even a partial restore makes cached answers stale
+        with span("cache.bump_tenant_version"):
+            semantic_cache.bump_tenant_version(owner_id)
+
+    duration = time.time() - start_time
+    rate = MetricsCollector.track_bulk_import(restored, duration)
+    return {
+        "owner_id": owner_id,
+        "snapshot_id": snapshot_id,
+        "restored": restored,
+        "removed": removed,
+        "seconds": round(duration, 3),
+        "vectors_per_second": round(rate, 1),
+    }
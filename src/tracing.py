@@ -0,0 +1,403 @@
+"""
+Tracing
+
+Lightweight stage-level spans for the API and the Celery workers.
+
+- `span(name)` is a context manager and `traced(name)` a decorator; spans
+  nest through a context variable, so they follow a request into FastAPI's
+  threadpool.
+- Trace context crosses into Celery as a W3C `traceparent` task header,
+  so a task's spans join the trace of the request that queued it.
+- Every finished span is observed in `stage_duration_seconds{stage}` with
+  its trace id as an exemplar (visible when /metrics is scraped in the
+  OpenMetrics format).
+- Spans can be exported in batches to a local JSONL file or to an OTLP/HTTP
+  collector (JSON encoding) from a background thread.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable
+
+from pydantic_settings import BaseSettings
+
+from monitoring import logger, stage_duration_seconds
+
+
+class TracingSettings(BaseSettings):
+    """Loads tracing settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    TRACING_ENABLED: bool = True
+    # none, file (JSONL at TRACING_FILE) or otlp (OTLP/HTTP JSON)
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_COLLECTOR_URL: str = "http://otel-collector:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "vectorvault"
+    TRACING_FLUSH_INTERVAL_SECONDS: float = 1.0
+    TRACING_MAX_BATCH: int = 512
+
+
+tracing_settings = TracingSettings()
+
+
+@dataclass(eq=False)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+    """(trace_id, parent span_id) from a W3C traceparent header, if valid."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+# ============= Span API =============
+def start_span(
+    name: str, traceparent: str | None = None, activate: bool = True, **attributes
+) -> tuple[Span, object]:
+    """
+    Open a span as a child of the current one (or of a remote `traceparent`)
+    and, with `activate`, make it current. Returns the span and a token for
+    `end_span`.
+    """
+    remote = parse_traceparent(traceparent)
+    parent = _current_span.get()
+    if remote:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = _new_id(128), None
+    span_ = Span(name, trace_id, _new_id(64), parent_id, attributes=attributes)
+    return span_, _current_span.set(span_) if activate else None
+
+
+def end_span(span_: Span, token, error: BaseException | str | None = None):
+    """Close a span from `start_span`, record its stage duration and export it."""
+    span_.end_ns = time.time_ns()
+    if error is not None:
+        span_.error = error if isinstance(error, str) else type(error).__name__
+    if token is not None:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Ended from a different context (e.g. a Celery signal handler)
+            _current_span.set(None)
+    stage_duration_seconds.labels(stage=span_.name).observe(
+        span_.duration, exemplar={"trace_id": span_.trace_id}
+    )
+    _exporter.submit(span_)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a stage of the current trace."""
+    if not tracing_settings.TRACING_ENABLED:
+        yield None
+        return
+    span_, token = start_span(name, **attributes)
+    try:
+        yield span_
+    except BaseException as e:
+        end_span(span_, token, error=e)
+        raise
+    end_span(span_, token)
+
+
+def traced(name: str | None = None):
+    """Decorator form of `span`; the stage defaults to module.function."""
+    def decorator(func: Callable):
+        stage = name or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with span(stage):
+                return await func(*args, **kwargs)
+
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+
+        if asyncio.iscoroutinefunction(func):
+            return async_wrapper
+        else:
+            return sync_wrapper
+    return decorator
+
+
+# ============= Exporters =============
+class FileExporter:
+    """Appends one JSON object per span to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]):
+        lines = "".join(json.dumps(s.to_dict()) + "\n" for s in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class CollectorExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, url: str, service_name: str, timeout: float = 2.0):
+        self.url = url
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _encode(self, s: Span) -> dict:
+        encoded = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [self._attribute(k, v) for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            encoded["parentSpanId"] = s.parent_id
+        return encoded
+
+    def export(self, spans: list[Span]):
+        body = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "vectorvault"}, "spans": [self._encode(s) for s in spans]}],
+            }]
+        }).encode()
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class BatchExporter:
+    """
+    Queues finished spans and exports them from a background thread, so
+    request paths never wait on file or network I/O. The thread is started
+    lazily per process, which keeps it fork-safe for Celery's prefork pool.
+    """
+
+    def __init__(self, exporter=None, flush_interval: float = 1.0, max_batch: int = 512):
+        self.exporter = exporter
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, span_: Span):
+        if self.exporter is None:
+            return
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put(span_)
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.SimpleQueue()
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="span-exporter", daemon=True).start()
+
+    def _drain(self) -> list[Span]:
+        batch = []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        while batch := self._drain():
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning(f"Dropped {len(batch)} spans, export failed: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+def _make_exporter():
+    kind = tracing_settings.TRACING_EXPORTER
+    if kind == "file":
+        return FileExporter(tracing_settings.TRACING_FILE)
+    if kind == "otlp":
+        return CollectorExporter(tracing_settings.TRACING_COLLECTOR_URL, tracing_settings.TRACING_SERVICE_NAME)
+    return None
+
+
+_exporter = BatchExporter(
+    _make_exporter(),
+    flush_interval=tracing_settings.TRACING_FLUSH_INTERVAL_SECONDS,
+    max_batch=tracing_settings.TRACING_MAX_BATCH,
+)
+
+
+@atexit.register
+def _flush_at_exit():
+    if _exporter.exporter is not None and _exporter._pid == os.getpid():
+        _exporter.flush()
+
+
+# ============= Celery Propagation =============
+# Open task spans by task id, between task_prerun and task_postrun
+_task_spans: dict[str, tuple[Span, object]] = {}
+# Open dispatch spans by task id, between before_ and after_task_publish
+_publish_spans: dict[str, tuple[Span, object]] = {}
+
+
+def _on_before_task_publish(sender=None, headers=None, **kwargs):
+    if not tracing_settings.TRACING_ENABLED or headers is None:
+        return
+    # Not made current: if publishing fails, after_task_publish never fires
+    publish = start_span("celery.publish", activate=False, task=sender)
+    _publish_spans[headers.get("id")] = publish
+    headers["traceparent"] = publish[0].traceparent
+
+
+def _on_after_task_publish(sender=None, headers=None, **kwargs):
+    publish = _publish_spans.pop((headers or {}).get("id"), None)
+    if publish is not None:
+        end_span(*publish)
+
+
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    if not tracing_settings.TRACING_ENABLED:
+        return
+    traceparent = getattr(task.request, "traceparent", None)
+    _task_spans[task_id] = start_span(f"task.{task.name}", traceparent=traceparent, task_id=task_id)
+
+
+def _on_task_postrun(task_id=None, state=None, **kwargs):
+    task_span = _task_spans.pop(task_id, None)
+    if task_span is not None:
+        end_span(*task_span, error=state if state == "FAILURE" else None)
+
+
+def install_celery_hooks():
+    """
+    Propagate trace context through task headers and open a span around
+    each task. Needed in both the API (publishing) and the worker.
+    """
+    from celery.signals import (
+        after_task_publish,
+        before_task_publish,
+        task_postrun,
+        task_prerun,
+    )
+    before_task_publish.connect(_on_before_task_publish, weak=False)
+    after_task_publish.connect(_on_after_task_publish, weak=False)
+    task_prerun.connect(_on_task_prerun, weak=False)
+    task_postrun.connect(_on_task_postrun, weak=False)
+
+
+# ============= Middleware =============
+class TracingMiddleware:
+    """Opens the root span of each request and returns its id as X-Trace-Id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing_settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with span("http.request", traceparent=traceparent, method=scope["method"], path=scope["path"]) as root:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("status", message["status"])
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", root.trace_id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,289 @@
+"""
+Vector Store Access
+
+Access layer over ChromaDB shared by the API and the Celery workers.
+Every tenant (user) gets its own collection.
+
+- One client per process, created lazily and reset after fork (Celery's
+  prefork pool, uvicorn workers). Its HTTP session keeps a pool of
+  keep-alive connections sized for the API threadpool.
+- An LRU cache of tenant collection handles, so a search or ingest does
+  not pay a get_or_create round trip. Entries expire after a TTL, are
+  dropped when the collection is deleted through this module, and are
+  dropped when a call on the handle fails (e.g. deleted elsewhere).
+- Batched upsert/delete helpers with configurable batch sizes. Deletes
+  bump the tenant's version, so the semantic answer cache stops serving
+  answers built from deleted documents (writers of new vectors bump it
+  once their whole write is done).
+- Every call to the server is counted per operation (and per request, see
+  `MetricsMiddleware`); write batch sizes are recorded too.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from pydantic_settings import BaseSettings
+
+import semantic_cache
+from monitoring import MetricsCollector, logger
+
+
+class VectorStoreSettings(BaseSettings):
+    """Loads vector-store settings from .env."""
+    model_config = {
+        "env_file": ".env",
+        "extra": "ignore"
+    }
+
+    CHROMA_HOST: str = "chromadb"
+    CHROMA_PORT: int = 8000
+    # Keep-alive connections per process; match the API threadpool size
+    CHROMA_POOL_SIZE: int = 40
+    CHROMA_COLLECTION_CACHE_SIZE: int = 1024
+    CHROMA_COLLECTION_CACHE_TTL_SECONDS: float = 300.0
+
+    # Shared between the API and the workers (both mount the repo at /app)
+    DATA_DIR: str = "data"
+    IMPORT_BATCH_SIZE: int = 5000
+    # Upload caps: vector values (count * dimension) and bytes per ids/metadata file
+    IMPORT_MAX_VALUES: int = 256 * 1024 * 1024
+    IMPORT_MAX_FILE_BYTES: int = 1024 * 1024 * 1024
+    # Chunks embedded and stored per step of document ingestion
+    INGEST_BATCH_SIZE: int = 64
+    SNAPSHOT_BATCH_SIZE: int = 5000
+    UPSERT_BATCH_SIZE: int = 1000
+    DELETE_BATCH_SIZE: int = 5000
+
+
+vector_settings = VectorStoreSettings()
+
+_client = None
+_client_lock = threading.Lock()
+_embedding_function = None
+
+
+# ============= Client =============
+def _configure_pool(client):
+    """Size the client's requests.Session connection pool (default is 10)."""
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is None:
+        logger.warning("ChromaDB client has no HTTP session; connection pool left at defaults")
+        return
+    from requests.adapters import HTTPAdapter
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=vector_settings.CHROMA_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def get_client():
+    """Return the process-wide ChromaDB client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import chromadb
+                client = chromadb.HttpClient(
+                    host=vector_settings.CHROMA_HOST,
+                    port=vector_settings.CHROMA_PORT,
+                )
+                _configure_pool(client)
+                _client = client
+    return _client
+
+
+def reset_client():
+    """Drop the client and cached handles (their sockets belong to the parent after a fork)."""
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+    collection_cache.reset()
+    if "chromadb" in sys.modules:
+        # HttpClient shares one System (and HTTP session) per host/port
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+
+
+def heartbeat() -> int:
+    MetricsCollector.track_vector_db_call("heartbeat")
+    return get_client().heartbeat()
+
+
+# ============= Collection Handles =============
+_COUNTED_OPERATIONS = {"add", "count", "delete", "get", "modify", "peek", "query", "update", "upsert"}
+
+
+class TenantCollection:
+    """
+    A cached collection handle. Calls through it are counted, and a failed
+    call evicts the handle so the next lookup fetches a fresh one.
+    """
+
+    def __init__(self, owner_id: int, collection):
+        self.owner_id = owner_id
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in _COUNTED_OPERATIONS:
+            return attr
+
+        def call(*args, **kwargs):
+            ids = kwargs.get("ids")
+            batch_size = len(ids) if name in ("add", "upsert", "update", "delete") and ids is not None else None
+            MetricsCollector.track_vector_db_call(name, batch_size)
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                collection_cache.invalidate(self.owner_id)
+                raise
+        return call
+
+
+class CollectionCache:
+    """Thread-safe LRU of tenant collection handles with a TTL."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._handles: OrderedDict[int, tuple[float, TenantCollection]] = OrderedDict()
+
+    def get(self, owner_id: int) -> TenantCollection | None:
+        with self._lock:
+            entry = self._handles.get(owner_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._handles.pop(owner_id, None)
+                return None
+            self._handles.move_to_end(owner_id)
+            return entry[1]
+
+    def put(self, owner_id: int, handle: TenantCollection):
+        with self._lock:
+            self._handles[owner_id] = (time.monotonic(), handle)
+            self._handles.move_to_end(owner_id)
+            while len(self._handles) > self.max_size:
+                self._handles.popitem(last=False)
+
+    def invalidate(self, owner_id: int):
+        with self._lock:
+            self._handles.pop(owner_id, None)
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._handles = OrderedDict()
+
+    def __len__(self):
+        return len(self._handles)
+
+
+collection_cache = CollectionCache(
+    vector_settings.CHROMA_COLLECTION_CACHE_SIZE,
+    vector_settings.CHROMA_COLLECTION_CACHE_TTL_SECONDS,
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_client)
+
+
+def tenant_collection_name(owner_id: int) -> str:
+    return f"user_{owner_id}"
+
+
+def chunk_vector_id(document_id: int, index: int) -> str:
+    """Stable ID of a document chunk's vector, so re-ingesting overwrites it."""
+    return f"doc{document_id}:{index}"
+
+
+def get_tenant_collection(owner_id: int) -> TenantCollection:
+    """Get (or create) the collection holding a tenant's vectors."""
+    handle = collection_cache.get(owner_id)
+    MetricsCollector.track_collection_cache(handle is not None)
+    if handle is None:
+        MetricsCollector.track_vector_db_call("get_or_create_collection")
+        collection = get_client().get_or_create_collection(
+            name=tenant_collection_name(owner_id),
+            metadata={"hnsw:space": "cosine"},
+        )
+        handle = TenantCollection(owner_id, collection)
+        collection_cache.put(owner_id, handle)
+    return handle
+
+
+def delete_tenant_collection(owner_id: int):
+    """Delete a tenant's collection, evict its cached handle and invalidate cached answers."""
+    collection_cache.invalidate(owner_id)
+    MetricsCollector.track_vector_db_call("delete_collection")
+    try:
+        get_client().delete_collection(tenant_collection_name(owner_id))
+    finally:
+        # A concurrent lookup may have re-cached the handle meanwhile
+        collection_cache.invalidate(owner_id)
+        semantic_cache.bump_tenant_version(owner_id)
+
+
+# ============= Batched Writes =============
+def _batch_limit(batch_size: int) -> int:
+    """Never exceed the server's own per-request limit."""
+    server_max = getattr(get_client(), "max_batch_size", -1)
+    return min(batch_size, server_max) if server_max and server_max > 0 else batch_size
+
+
+def upsert(
+    owner_id: int,
+    ids: list[str],
+    embeddings: np.ndarray | list | None = None,
+    metadatas: list[dict] | None = None,
+    documents: list[str] | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """Upsert records into a tenant's collection in batches; returns the count written."""
+    collection = get_tenant_collection(owner_id)
+    size = _batch_limit(batch_size or vector_settings.UPSERT_BATCH_SIZE)
+    for start in range(0, len(ids), size):
+        end = start + size
+        batch = {"ids": ids[start:end]}
+        if embeddings is not None:
+            chunk = embeddings[start:end]
+            batch["embeddings"] = chunk.tolist() if isinstance(chunk, np.ndarray) else chunk
+        if metadatas is not None:
+            batch["metadatas"] = metadatas[start:end]
+        if documents is not None:
+            batch["documents"] = documents[start:end]
+        collection.upsert(**batch)
+    return len(ids)
+
+
+def delete(owner_id: int, ids: list[str], batch_size: int | None = None) -> int:
+    """Delete records from a tenant's collection by id, in batches, and invalidate cached answers."""
+    if not ids:
+        return 0
+    collection = get_tenant_collection(owner_id)
+    size = _batch_limit(batch_size or vector_settings.DELETE_BATCH_SIZE)
+    try:
+        for start in range(0, len(ids), size):
+            collection.delete(ids=ids[start:start + size])
+    finally:
+        # Even a partial delete makes cached answers stale
+        semantic_cache.bump_tenant_version(owner_id)
+    return len(ids)
+
+
+# ============= Embeddings =============
+def get_embedding_function():
+    """
+    The embedding function collections use by default, loaded once per
+    process. Queries embedded here land in the same space as stored text.
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        from chromadb.utils import embedding_functions
+        _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    return _embedding_function
+
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    return np.asarray(get_embedding_function()(texts), dtype=np.float32)
@@ -0,0 +1,19 @@
+import os
+import sys
+from pathlib import Path
+
+# The app modules live in src/ and import each other without a package prefix
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# Settings are required at import time; unit tests never touch a real database
+for key, value in {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+}.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,138 @@
+import time
+
+import fakeredis
+import pytest
+from fakeredis import aioredis
+from jose import jwt
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import admission
+from admission import AdaptiveLimiter, AdmissionControlMiddleware
+from database import settings
+
+ALICE = {"Authorization": "Bearer " + jwt.encode({"sub": "alice"}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)}
+
+
+class FailingRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, script):
+        async def run(**kwargs):
+            self.calls += 1
+            raise ConnectionError("redis down")
+        return run
+
+    async def zrem(self, key, member):
+        raise ConnectionError("redis down")
+
+
+def make_client(redis_client, limiter=None):
+    app = Starlette(routes=[
+        Route("/work", lambda request: PlainTextResponse("ok")),
+        Route("/token", lambda request: PlainTextResponse("ok")),
+        Route("/health", lambda request: PlainTextResponse("ok")),
+    ])
+    app.add_middleware(AdmissionControlMiddleware, redis_client=redis_client, limiter=limiter)
+    return TestClient(app)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def async_redis(server):
+    return aioredis.FakeRedis(server=server)
+
+
+@pytest.fixture
+def sync_redis(server):
+    return fakeredis.FakeRedis(server=server)
+
+
+def test_limiter_backs_off_on_slow_responses_and_recovers():
+    limiter = AdaptiveLimiter(max_limit=100, min_limit=4, latency_target=0.5)
+    for i in range(50):
+        limiter.observe(2.0, now=float(i))
+    assert limiter.limit == 4
+    for _ in range(200):
+        limiter.observe(0.01)
+    assert 4 < limiter.limit <= 100
+
+
+def test_limiter_decreases_at_most_once_per_interval():
+    limiter = AdaptiveLimiter(max_limit=256, min_limit=8, latency_target=1.0)
+    # A burst of slow logins is one congestion signal, not 33
+    for _ in range(33):
+        limiter.observe(2.4, now=100.0)
+    assert limiter.limit == 256 * 0.9
+    limiter.observe(2.4, now=101.0)
+    assert limiter.limit == 256 * 0.9 * 0.9
+
+
+def test_slow_by_design_routes_do_not_shrink_the_limit():
+    limiter = AdaptiveLimiter(max_limit=100, min_limit=4, latency_target=0.0)
+    client = make_client(FailingRedis(), limiter)
+    assert client.get("/token").status_code == 200
+    assert limiter.limit == 100
+    client.get("/work")
+    assert limiter.limit < 100
+
+
+def test_sheds_with_503_when_over_the_concurrency_limit():
+    limiter = AdaptiveLimiter(max_limit=1, min_limit=1, latency_target=1.0)
+    limiter.in_flight = 1  # another request is already running
+    client = make_client(FailingRedis(), limiter)
+    response = client.get("/work")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    # Exempt paths always pass
+    assert client.get("/health").status_code == 200
+
+
+def test_token_bucket_throttles_with_429(monkeypatch, async_redis):
+    monkeypatch.setattr(admission.admission_settings, "RATE_LIMIT_PER_SECOND", 0.5)
+    monkeypatch.setattr(admission.admission_settings, "RATE_LIMIT_BURST", 3)
+    with make_client(async_redis) as client:
+        codes = [client.get("/work").status_code for _ in range(5)]
+    assert codes == [200, 200, 200, 429, 429]
+
+
+def test_concurrency_slots_are_released(async_redis, sync_redis):
+    with make_client(async_redis) as client:
+        for _ in range(20):
+            assert client.get("/work", headers=ALICE).status_code == 200
+    assert sync_redis.zcard("vectorvault:inflight:user:alice") == 0
+
+
+def test_concurrency_limit(monkeypatch, async_redis, sync_redis):
+    monkeypatch.setattr(admission.admission_settings, "MAX_CONCURRENT_PER_USER", 2)
+    far = (time.time() + 60) * 1000
+    sync_redis.zadd("vectorvault:inflight:user:alice", {"a": far, "b": far})
+    with make_client(async_redis) as client:
+        assert client.get("/work", headers=ALICE).status_code == 429
+        # Other clients are unaffected
+        assert client.get("/work").status_code == 200
+
+
+def test_leaked_slots_expire(monkeypatch, async_redis, sync_redis):
+    monkeypatch.setattr(admission.admission_settings, "MAX_CONCURRENT_PER_USER", 2)
+    past = (time.time() - 1) * 1000
+    # Leases of requests whose worker was killed
+    sync_redis.zadd("vectorvault:inflight:user:alice", {"a": past, "b": past})
+    with make_client(async_redis) as client:
+        assert client.get("/work", headers=ALICE).status_code == 200
+    assert sync_redis.zcard("vectorvault:inflight:user:alice") == 0
+
+
+def test_redis_outage_fails_open_and_trips_the_breaker():
+    redis_client = FailingRedis()
+    client = make_client(redis_client)
+    assert [client.get("/work").status_code for _ in range(3)] == [200, 200, 200]
+    # Only the first request waited on Redis
+    assert redis_client.calls == 1
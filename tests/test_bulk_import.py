@@ -0,0 +1,94 @@
+import io
+
+import numpy as np
+import pytest
+
+import bulk_import
+from vector_store import vector_settings
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_settings, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def npy_bytes(array):
+    buf = io.BytesIO()
+    np.save(buf, array)
+    buf.seek(0)
+    return buf
+
+
+def test_stage_and_iterate_batches():
+    vectors = np.random.default_rng(0).random((25, 8), dtype=np.float32)
+    ids = io.BytesIO("\n".join(f"id-{i}" for i in range(25)).encode())
+    metadata = io.BytesIO(b"".join(b'{"row": %d}\n' % i for i in range(25)))
+
+    staged = bulk_import.stage_upload(7, npy_bytes(vectors), ids, metadata)
+    assert (staged.count, staged.dimension) == (25, 8)
+
+    batches = list(bulk_import.iter_batches(staged.path, batch_size=10))
+    assert [len(b[0]) for b in batches] == [10, 10, 5]
+    assert batches[2][0][-1] == "id-24"
+    assert batches[2][2][-1] == {"row": 24}
+    np.testing.assert_array_equal(np.concatenate([b[1] for b in batches]), vectors)
+
+
+@pytest.mark.parametrize("array", [
+    np.zeros((4, 3), dtype=np.float64),
+    np.zeros(12, dtype=np.float32),
+    np.asfortranarray(np.zeros((4, 3), dtype=np.float32)),
+])
+def test_rejects_bad_vector_layouts(array):
+    with pytest.raises(bulk_import.BulkImportError):
+        bulk_import.stage_upload(1, npy_bytes(array), io.BytesIO(b"a\nb\nc\nd\n"))
+
+
+def test_rejects_truncated_payload_and_count_mismatch(data_dir):
+    payload = npy_bytes(np.zeros((4, 3), dtype=np.float32)).getvalue()
+    with pytest.raises(bulk_import.BulkImportError):
+        bulk_import.stage_upload(1, io.BytesIO(payload[:-4]), io.BytesIO(b"a\nb\nc\nd\n"))
+
+    with pytest.raises(bulk_import.BulkImportError):
+        bulk_import.stage_upload(1, io.BytesIO(payload), io.BytesIO(b"a\nb\n"))
+    # Failed uploads leave nothing behind
+    assert not any(p.is_file() for p in data_dir.rglob("*"))
+
+
+def test_crlf_line_endings_are_normalized():
+    staged = bulk_import.stage_upload(
+        1, npy_bytes(np.zeros((2, 3), dtype=np.float32)),
+        io.BytesIO(b"a\r\nb\r\n"), io.BytesIO(b'{"k": 1}\r\n{"k": 2}'),
+    )
+    ((ids, _, metadatas),) = bulk_import.iter_batches(staged.path, batch_size=10)
+    assert ids == ["a", "b"]
+    assert metadatas == [{"k": 1}, {"k": 2}]
+
+
+@pytest.mark.parametrize("ids, metadata", [
+    (b"a\na\nb\n", None),
+    (b"a\n\nb\n", None),
+    (b"a\nb\nc\n", b'{"k": 1}\n{not json\n{"k": 3}\n'),
+    (b"a\nb\nc\n", b'{"k": 1}\n{"k": [1, 2]}\n{"k": 3}\n'),
+    (b"a\nb\nc\n", b'{"k": 1}\n{}\n{"k": 3}\n'),
+    (b"a\nb\nc\n", b'{"k": 1}\n[1]\n{"k": 3}\n'),
+])
+def test_rejects_bad_ids_and_metadata_at_staging(data_dir, ids, metadata):
+    with pytest.raises(bulk_import.BulkImportError):
+        bulk_import.stage_upload(
+            1, npy_bytes(np.zeros((3, 2), dtype=np.float32)),
+            io.BytesIO(ids), io.BytesIO(metadata) if metadata else None,
+        )
+    assert not any(p.is_file() for p in data_dir.rglob("*"))
+
+
+def test_upload_size_caps(monkeypatch):
+    monkeypatch.setattr(vector_settings, "IMPORT_MAX_VALUES", 11)
+    with pytest.raises(bulk_import.BulkImportError):
+        bulk_import.stage_upload(1, npy_bytes(np.zeros((4, 3), dtype=np.float32)), io.BytesIO(b"a\nb\nc\nd\n"))
+
+    monkeypatch.setattr(vector_settings, "IMPORT_MAX_VALUES", 12)
+    monkeypatch.setattr(vector_settings, "IMPORT_MAX_FILE_BYTES", 7)
+    with pytest.raises(bulk_import.BulkImportError):
+        bulk_import.stage_upload(1, npy_bytes(np.zeros((4, 3), dtype=np.float32)), io.BytesIO(b"a\nb\nc\nd\n"))
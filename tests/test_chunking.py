@@ -0,0 +1,69 @@
+import pytest
+
+from chunking import TokenCounter, iter_chunks
+
+
+class WordCounter(TokenCounter):
+    """Deterministic 'exact' tokenizer: one token per word."""
+
+    def __init__(self):
+        super().__init__(exact=False)
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def make_pages(n_pages=5, words_per_page=300):
+    return [
+        " ".join(f"p{p}w{w}" for w in range(words_per_page))
+        for p in range(n_pages)
+    ]
+
+
+def test_offsets_point_back_into_source():
+    pages = make_pages()
+    document = "".join(pages)
+    for chunk in iter_chunks(iter(pages), max_tokens=64, overlap_tokens=8):
+        source = document[chunk.start_offset:chunk.end_offset]
+        if chunk.page_start == chunk.page_end:
+            assert source == chunk.text
+        else:
+            assert "".join(source.split()) == "".join(chunk.text.split())
+
+
+def test_chunks_respect_exact_budget_and_overlap():
+    pages = make_pages()
+    chunks = list(iter_chunks(iter(pages), max_tokens=50, overlap_tokens=10, counter=WordCounter()))
+    assert all(c.token_count <= 50 for c in chunks)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start_offset < prev.end_offset
+        assert nxt.start_offset > prev.start_offset
+
+    # Every word is covered by at least one chunk
+    covered = set()
+    for c in chunks:
+        covered.update(c.text.split())
+    assert covered == set(" ".join(pages).split())
+
+
+def test_pages_do_not_fuse_and_page_numbers_are_tracked():
+    chunks = list(iter_chunks(iter(["alpha", "beta", "gamma"]), max_tokens=100, overlap_tokens=0))
+    assert len(chunks) == 1
+    assert chunks[0].text.split() == ["alpha", "beta", "gamma"]
+    assert (chunks[0].page_start, chunks[0].page_end) == (1, 3)
+
+
+def test_long_words_are_hard_split():
+    chunks = list(iter_chunks(iter(["x" * 1000]), max_tokens=10, overlap_tokens=0))
+    assert "".join(c.text for c in chunks) == "x" * 1000
+    assert all(c.token_count <= 10 for c in chunks)
+
+
+def test_empty_and_whitespace_documents():
+    assert list(iter_chunks(iter([]))) == []
+    assert list(iter_chunks(iter(["   ", "\n\n"]))) == []
+
+
+def test_invalid_budget():
+    with pytest.raises(ValueError):
+        list(iter_chunks(iter(["a"]), max_tokens=10, overlap_tokens=10))
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import generation
+
+
+def collect(tokens, limit=None, **kwargs):
+    async def run():
+        out = []
+        stream = generation.stream_tokens(tokens, **kwargs)
+        async for token in stream:
+            out.append(token)
+            if limit and len(out) == limit:
+                await stream.aclose()
+                break
+        return out
+    return asyncio.run(run())
+
+
+def test_echo_generator_is_deterministic():
+    gen = generation.get_generator("echo")
+    first = "".join(gen.generate("q", ["alpha beta", "gamma"]))
+    assert first == "Based on 2 sources: alpha beta gamma"
+    assert first == "".join(gen.generate("q", ["alpha beta", "gamma"]))
+
+
+def test_stream_tokens_yields_everything_in_order():
+    tokens = [f"t{i}" for i in range(200)]
+    assert collect(iter(tokens), max_buffer=4) == tokens
+
+
+def test_stream_tokens_propagates_generator_errors():
+    def broken():
+        yield "ok"
+        raise RuntimeError("model failed")
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        collect(broken())
+
+
+def test_early_close_stops_the_producer():
+    produced = []
+    finished = threading.Event()
+
+    def endless():
+        try:
+            i = 0
+            while True:
+                produced.append(i)
+                yield str(i)
+                i += 1
+        finally:
+            finished.set()
+
+    assert collect(endless(), limit=3, max_buffer=2) == ["0", "1", "2"]
+    assert finished.wait(timeout=2)
+    # Backpressure: the producer never ran far ahead of the consumer
+    assert len(produced) < 10
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        generation.get_generator("nope")
+
+
+def test_generator_is_abstract():
+    with pytest.raises(TypeError):
+        generation.Generator()
+
+
+def test_time_to_first_token_counts_from_request_start(monkeypatch):
+    recorded = {}
+    monkeypatch.setattr(
+        generation.MetricsCollector, "track_generation",
+        lambda **kwargs: recorded.update(kwargs),
+    )
+    started = time.perf_counter() - 1.0  # e.g. a second spent on retrieval
+    assert collect(iter(["a", "b"]), started_at=started) == ["a", "b"]
+    assert recorded["time_to_first_token"] >= 1.0
+    assert recorded["duration"] < 1.0
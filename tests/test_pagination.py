@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import crud, models, schemas
+from database import Base
+from monitoring import MetricsCollector, estimate_row_count, knowledge_bases_total
+from pagination import CursorError, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.User(id=1, username="alice", hashed_password="x"),
+        models.User(id=2, username="bob", hashed_password="x"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_knowledge_bases(db, owner_id, count, ties=3):
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db.add_all([
+        # Groups of `ties` rows share a created_at, so the id tie-break matters
+        models.KnowledgeBase(owner_id=owner_id, name=f"kb-{i}", created_at=base + timedelta(seconds=i // ties))
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def walk(list_page, limit):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = list_page(limit, cursor)
+        seen.extend(rows)
+        if cursor is None:
+            return seen
+
+
+def test_keyset_pages_cover_every_row_once_newest_first(db):
+    add_knowledge_bases(db, owner_id=1, count=23)
+    add_knowledge_bases(db, owner_id=2, count=5)
+
+    rows = walk(lambda limit, cursor: crud.list_knowledge_bases(db, 1, limit, cursor), limit=4)
+
+    assert len(rows) == 23
+    assert len({r.id for r in rows}) == 23
+    assert all(r.owner_id == 1 for r in rows)
+    keys = [(r.created_at, r.id) for r in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_last_page_has_no_cursor(db):
+    add_knowledge_bases(db, owner_id=1, count=4)
+    rows, cursor = crud.list_knowledge_bases(db, 1, limit=4)
+    assert len(rows) == 4 and cursor is None
+
+
+def test_chunks_page_in_document_order(db):
+    kb = crud.create_knowledge_base(db, schemas.KnowledgeBaseCreate(name="kb"), owner_id=1)
+    document = models.Document(owner_id=1, knowledge_base_id=kb.id, filename="a.pdf")
+    db.add(document)
+    db.commit()
+    db.add_all([
+        models.Chunk(owner_id=1, document_id=document.id, index=i, text=f"chunk {i}", token_count=2)
+        for i in reversed(range(10))
+    ])
+    db.commit()
+
+    rows = walk(lambda limit, cursor: crud.list_chunks(db, 1, document.id, limit, cursor), limit=3)
+    assert [r.index for r in rows] == list(range(10))
+    assert crud.list_chunks(db, 2, document.id, 10) == ([], None)
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    columns = [models.KnowledgeBase.created_at, models.KnowledgeBase.id]
+    created_at = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor([created_at, 7]), columns) == [created_at, 7]
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor", columns)
+    with pytest.raises(CursorError):
+        decode_cursor(encode_cursor([1]), columns)
+
+
+def test_row_gauges_are_incremental_and_reseeded_from_estimates(db):
+    MetricsCollector.refresh_row_counts(db, max_age=0)
+    assert knowledge_bases_total._value.get() == 0
+    crud.create_knowledge_base(db, schemas.KnowledgeBaseCreate(name="kb"), owner_id=1)
+    assert knowledge_bases_total._value.get() == 1
+
+    add_knowledge_bases(db, owner_id=2, count=4)
+    assert estimate_row_count(db, "knowledge_bases") == 5
+    MetricsCollector.refresh_row_counts(db, max_age=0)
+    assert knowledge_bases_total._value.get() == 5
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import profiling
+from profiling import Profile, Profiler, ProfilingMiddleware
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def slow_endpoint(request):
+    busy_wait(0.1)
+    return PlainTextResponse("ok")
+
+
+def make_client(profiler):
+    app = Starlette(routes=[Route("/slow", slow_endpoint)])
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return TestClient(app)
+
+
+@pytest.fixture
+def profiler():
+    return Profiler(interval=0.001, max_active=2, buffer_size=3)
+
+
+def test_task_profile_samples_only_its_thread(profiler):
+    profile = profiler.start("task", "busy", thread_id=threading.get_ident())
+    other = threading.Thread(target=busy_wait, args=(0.1,))
+    other.start()
+    busy_wait(0.1)
+    other.join()
+    profiler.finish(profile)
+
+    assert profile.samples > 0
+    assert all("test_task_profile_samples_only_its_thread" in stack for stack in profile.stacks)
+    line = profile.collapsed().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("busy_wait (test_profiling.py:")
+    assert int(count) > 0
+
+
+def test_ring_buffer_keeps_last_n(profiler):
+    for i in range(5):
+        profiler.finish(profiler.start("task", f"t{i}"))
+    assert [p.name for p in profiler.recent()] == ["t4", "t3", "t2"]
+
+
+def test_max_active_bounds_concurrent_profiles(profiler):
+    running = [profiler.start("task", "a"), profiler.start("task", "b")]
+    assert profiler.start("task", "c") is None
+    for profile in running:
+        profiler.finish(profile)
+    assert profiler.sampler.active == 0
+
+
+def test_unselected_requests_are_not_profiled(profiler, monkeypatch):
+    monkeypatch.setattr(profiling.profiling_settings, "PROFILING_SAMPLE_RATE", 0.0)
+    with make_client(profiler) as client:
+        response = client.get("/slow")
+    assert "x-profile-id" not in response.headers
+    assert profiler.recent() == []
+
+
+def test_profile_header_requires_admin(profiler, monkeypatch):
+    monkeypatch.setattr(profiling, "_is_admin", lambda scope: False)
+    with make_client(profiler) as client:
+        response = client.get("/slow", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert profiler.recent() == []
+
+
+def test_admin_header_profiles_request(profiler, monkeypatch):
+    monkeypatch.setattr(profiling, "_is_admin", lambda scope: True)
+    with make_client(profiler) as client:
+        response = client.get("/slow", headers={"X-Profile": "1"})
+    [profile] = profiler.recent()
+    assert response.headers["x-profile-id"] == profile.id
+    assert profile.name == "GET /slow"
+    assert any("slow_endpoint" in stack for stack in profile.stacks)
+
+
+def test_sample_rate_profiles_without_header(profiler, monkeypatch):
+    monkeypatch.setattr(profiling.profiling_settings, "PROFILING_SAMPLE_RATE", 1.0)
+    with make_client(profiler) as client:
+        response = client.get("/slow")
+    assert "x-profile-id" in response.headers
+
+
+def test_worker_profiles_round_trip_through_capped_redis_list(monkeypatch):
+    redis_client = fakeredis.FakeRedis()
+    monkeypatch.setattr(profiling.profiling_settings, "PROFILING_BUFFER_SIZE", 2)
+    for i in range(3):
+        profile = Profile(kind="task", name=f"t{i}", started_at=float(i))
+        profile.stacks["a;b"] = i + 1
+        profiling.publish_profile(profile, redis_client)
+
+    profiles = profiling.worker_profiles(redis_client)
+    assert [p.name for p in profiles] == ["t2", "t1"]
+    assert profiles[0].collapsed() == "a;b 3\n"
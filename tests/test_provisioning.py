@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import crud, models, provisioning, security
+from database import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(models.User(username="taken", hashed_password="x"))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def fake_hashing(monkeypatch):
+    batches = []
+
+    async def hash_passwords(passwords):
+        batches.append(list(passwords))
+        return [f"hashed:{p}" for p in passwords]
+    monkeypatch.setattr(provisioning, "hash_passwords", hash_passwords)
+    return batches
+
+
+async def stream(body: bytes, chunk_size: int = 7):
+    # Small chunks so lines are split across reads
+    for i in range(0, len(body), chunk_size):
+        yield body[i:i + chunk_size]
+
+
+def ndjson(*rows) -> bytes:
+    return b"".join((r if isinstance(r, bytes) else json.dumps(r).encode()) + b"\n" for r in rows)
+
+
+def provision(db, body):
+    return asyncio.run(provisioning.provision_users(db, stream(body)))
+
+
+def test_every_line_gets_a_result_in_order(db, fake_hashing, monkeypatch):
+    monkeypatch.setattr(provisioning.provisioning_settings, "PROVISION_BATCH_SIZE", 2)
+    body = ndjson(
+        {"username": "ann", "password": "pw1"},
+        b"{not json",
+        {"username": "taken", "password": "pw2"},
+        {"username": "bob", "password": "pw3"},
+        {"username": "ann", "password": "pw4"},
+        {"password": "pw5"},
+        b"",
+        {"username": "cy", "password": "pw6"},
+    )
+    results = provision(db, body)
+
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "created"), (2, "invalid"), (3, "exists"), (4, "created"),
+        (5, "duplicate"), (6, "invalid"), (8, "created"),
+    ]
+    users = {u.username: u for u in db.query(models.User).all()}
+    assert results[0]["id"] == users["ann"].id
+    assert users["bob"].hashed_password == "hashed:pw3"
+    # Existing usernames are filtered out before hashing
+    assert fake_hashing == [["pw1"], ["pw3", "pw6"]]
+
+
+def test_too_many_users_reports_what_was_committed(db, fake_hashing, monkeypatch):
+    monkeypatch.setattr(provisioning.provisioning_settings, "PROVISION_BATCH_SIZE", 2)
+    monkeypatch.setattr(provisioning.provisioning_settings, "PROVISION_MAX_USERS", 3)
+    body = ndjson(*({"username": f"u{i}", "password": "pw"} for i in range(5)))
+    results = provision(db, body)
+
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "created"), (2, "created"), (3, "created"), (4, "rejected"),
+    ]
+    assert {u.username for u in db.query(models.User).all()} == {"taken", "u0", "u1", "u2"}
+
+
+def test_over_long_line_stops_processing_there(db, fake_hashing, monkeypatch):
+    monkeypatch.setattr(provisioning.provisioning_settings, "PROVISION_MAX_LINE_BYTES", 64)
+    body = ndjson({"username": "ann", "password": "pw"}, {"username": "bob", "password": "x" * 100})
+    results = provision(db, body)
+    assert [(r["line"], r["status"]) for r in results] == [(1, "created"), (2, "rejected")]
+
+
+def test_over_long_line_inside_a_single_chunk_is_rejected(db, fake_hashing, monkeypatch):
+    monkeypatch.setattr(provisioning.provisioning_settings, "PROVISION_MAX_LINE_BYTES", 64)
+    body = ndjson(
+        {"username": "ann", "password": "pw"},
+        {"username": "bob", "password": "x" * 100},
+        {"username": "cy", "password": "pw"},
+    )
+    # Real clients send the body in large chunks, so whole lines arrive at once
+    results = asyncio.run(provisioning.provision_users(db, stream(body, chunk_size=len(body))))
+    assert [(r["line"], r["status"]) for r in results] == [(1, "created"), (2, "rejected")]
+    assert db.query(models.User).filter(models.User.username == "bob").first() is None
+
+
+def test_bulk_insert_skips_usernames_taken_concurrently(db):
+    created = crud.create_users_bulk(db, [("new", "h1"), ("taken", "h2")])
+    assert list(created) == ["new"]
+    assert crud.get_existing_usernames(db, ["new", "taken", "free"]) == {"new", "taken"}
+
+
+def test_process_pool_hashes_are_verifiable(monkeypatch):
+    monkeypatch.setattr(provisioning.provisioning_settings, "PROVISION_HASH_WORKERS", 2)
+    try:
+        hashed = asyncio.run(provisioning.hash_passwords(["alpha", "beta", "gamma"]))
+    finally:
+        provisioning.shutdown()
+    assert len(hashed) == 3
+    assert security.verify_password("gamma", hashed[2])
+    assert not security.verify_password("alpha", hashed[1])
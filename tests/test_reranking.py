@@ -0,0 +1,43 @@
+import numpy as np
+
+from reranking import mmr, mmr_batch
+
+
+def test_lambda_one_is_plain_relevance_order():
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal(8)
+    candidates = rng.standard_normal((10, 8))
+    relevance = (candidates / np.linalg.norm(candidates, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+    assert mmr(query, candidates, k=5, lambda_mult=1.0) == list(np.argsort(-relevance)[:5])
+
+
+def test_near_duplicates_are_demoted():
+    query = np.array([1.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.10],   # best match
+        [1.0, 0.11],   # near-duplicate of the best match
+        [0.7, -0.7],   # less relevant but different
+    ])
+    assert mmr(query, candidates, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_per_group_cap():
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.8, 0.0, 0.2], [0.1, 1.0, 0.0]])
+    groups = np.array([0, 0, 0, 1])
+    picked = mmr(query, candidates, k=3, lambda_mult=0.9, groups=groups, per_group_cap=1)
+    assert picked == [0, 3]
+
+
+def test_batch_matches_single_queries_and_respects_validity():
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((4, 16))
+    candidates = rng.standard_normal((4, 12, 16))
+    batched = mmr_batch(queries, candidates, k=5, lambda_mult=0.6)
+    for b in range(4):
+        assert list(batched[b]) == mmr(queries[b], candidates[b], k=5, lambda_mult=0.6)
+
+    valid = np.ones((4, 12), dtype=bool)
+    valid[0, 3:] = False
+    padded = mmr_batch(queries, candidates, k=5, valid=valid)
+    assert sorted(padded[0][:3]) == [0, 1, 2] and list(padded[0][3:]) == [-1, -1]
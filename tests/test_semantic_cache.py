@@ -0,0 +1,70 @@
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+ECHO_4 = {"top_k": 4, "backend": "echo"}
+
+
+def unit(*values):
+    v = np.asarray(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_hit_above_threshold_and_miss_below():
+    cache = SemanticCache(threshold=0.95, max_entries=10)
+    cache.store(1, unit(1, 0, 0), version=0, answer="A", sources=[], latency=1.5, **ECHO_4)
+
+    hit = cache.lookup(1, unit(1, 0.1, 0), version=0, **ECHO_4)
+    assert hit is not None and hit.answer == "A" and hit.similarity > 0.95
+    assert cache.lookup(1, unit(0, 1, 0), version=0, **ECHO_4) is None
+    # Tenants are isolated
+    assert cache.lookup(2, unit(1, 0, 0), version=0, **ECHO_4) is None
+
+
+def test_version_change_invalidates_tenant():
+    cache = SemanticCache(threshold=0.9, max_entries=10)
+    cache.store(1, unit(1, 0), version=3, answer="old", sources=[], latency=1.0, **ECHO_4)
+    assert cache.lookup(1, unit(1, 0), version=4, **ECHO_4) is None
+    # The stale entry is gone even for the old version
+    assert cache.lookup(1, unit(1, 0), version=3, **ECHO_4) is None
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = SemanticCache(threshold=0.99, max_entries=3)
+    basis = np.eye(4, dtype=np.float32)
+    for i in range(3):
+        cache.store(1, basis[i], version=0, answer=str(i), sources=[], latency=0.1, **ECHO_4)
+
+    assert cache.lookup(1, basis[0], version=0, **ECHO_4).answer == "0"  # touch entry 0
+    cache.store(1, basis[3], version=0, answer="3", sources=[], latency=0.1, **ECHO_4)
+
+    assert cache.lookup(1, basis[1], version=0, **ECHO_4) is None  # least recently used
+    assert [cache.lookup(1, basis[i], version=0, **ECHO_4).answer for i in (0, 2, 3)] == ["0", "2", "3"]
+
+
+def test_capacity_grows_past_initial_allocation():
+    cache = SemanticCache(threshold=0.999, max_entries=100)
+    vectors = np.random.default_rng(0).standard_normal((40, 16)).astype(np.float32)
+    for i, v in enumerate(vectors):
+        cache.store(5, v, version=0, answer=str(i), sources=[], latency=0.1, **ECHO_4)
+    assert all(cache.lookup(5, v, version=0, **ECHO_4).answer == str(i) for i, v in enumerate(vectors))
+
+
+def test_answers_are_not_shared_across_top_k_or_backend():
+    cache = SemanticCache(threshold=0.95, max_entries=10)
+    cache.store(1, unit(1, 0), version=0, answer="top1", sources=[], latency=1.0, top_k=1, backend="echo")
+    assert cache.lookup(1, unit(1, 0), version=0, top_k=20, backend="echo") is None
+    assert cache.lookup(1, unit(1, 0), version=0, top_k=1, backend="llm") is None
+
+    cache.store(1, unit(1, 0), version=0, answer="top20", sources=[], latency=1.0, top_k=20, backend="echo")
+    assert cache.lookup(1, unit(1, 0), version=0, top_k=20, backend="echo").answer == "top20"
+    assert cache.lookup(1, unit(1, 0), version=0, top_k=1, backend="echo").answer == "top1"
+
+
+def test_answers_from_an_older_version_are_dropped():
+    cache = SemanticCache(threshold=0.9, max_entries=10)
+    cache.store(1, unit(1, 0), version=5, answer="new", sources=[], latency=1.0, **ECHO_4)
+    # A slow request that read version 4 before an import bumped it
+    cache.store(1, unit(0, 1), version=4, answer="stale", sources=[], latency=1.0, **ECHO_4)
+    assert cache.lookup(1, unit(0, 1), version=4, **ECHO_4) is None
+    assert cache.lookup(1, unit(1, 0), version=5, **ECHO_4).answer == "new"
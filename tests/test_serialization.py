@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+import pytest
+
+import schemas
+import serialization
+
+
+def test_base64_roundtrip_is_exact():
+    vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+    encoded = serialization.encode_vector(vector, "base64")
+    np.testing.assert_array_equal(serialization.decode_vector(encoded), vector)
+
+
+def test_fast_response_matches_schema():
+    vector = np.arange(4, dtype=np.float32)
+    payload = {
+        "results": [{
+            "id": "a",
+            "document": "text",
+            "distance": np.float32(0.25),
+            "metadata": {"page": 1},
+            "embedding": serialization.encode_vector(vector, "json"),
+        }],
+        "vector_encoding": "json",
+    }
+    body = json.loads(serialization.FastJSONResponse(payload).body)
+    parsed = schemas.SearchResponse.model_validate(body)
+    assert parsed.results[0].embedding == [0.0, 1.0, 2.0, 3.0]
+    assert parsed.results[0].distance == 0.25
+
+
+def test_none_encoding_and_unknown_encoding():
+    assert serialization.encode_vector(np.ones(3), "none") is None
+    assert serialization.encode_vector(None, "json") is None
+    with pytest.raises(ValueError):
+        serialization.encode_vector(np.ones(3), "hex")
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+import snapshots
+from vector_store import vector_settings
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_settings, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+class FakeCollection:
+    """Minimal stand-in for a Chroma collection's paging API."""
+
+    def __init__(self, n=23, dim=6):
+        rng = np.random.default_rng(0)
+        self.ids = [f"doc-{i}-é" for i in range(n)]
+        self.embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+        self.metadatas = [{"page": i} if i % 3 else None for i in range(n)]
+        self.documents = [f"text {i} ü" if i % 4 else None for i in range(n)]
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, include, limit, offset):
+        stop = offset + limit
+        page = {"ids": self.ids[offset:stop]}
+        if "embeddings" in include:
+            page["embeddings"] = self.embeddings[offset:stop].tolist()
+        if "metadatas" in include:
+            page["metadatas"] = self.metadatas[offset:stop]
+        if "documents" in include:
+            page["documents"] = self.documents[offset:stop]
+        return page
+
+    def delete(self, ids):
+        drop = set(ids)
+        keep = [i for i, record_id in enumerate(self.ids) if record_id not in drop]
+        self.ids = [self.ids[i] for i in keep]
+        self.embeddings = self.embeddings[keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_export_and_restore_roundtrip(quantize):
+    collection = FakeCollection()
+    manifest = snapshots.export_collection(collection, owner_id=3, quantize=quantize, batch_size=5)
+    assert manifest["count"] == 23 and manifest["dimension"] == 6
+    assert [m["snapshot_id"] for m in snapshots.list_snapshots(3)] == [manifest["snapshot_id"]]
+
+    snap = snapshots.open_snapshot(3, manifest["snapshot_id"])
+    assert isinstance(snap.vectors, np.memmap)
+
+    ids, vectors, metas, docs = [], [], [], []
+    for batch_ids, batch_vectors, batch_meta, batch_docs in snap.iter_batches(batch_size=10):
+        ids += batch_ids
+        vectors.append(batch_vectors)
+        metas += batch_meta
+        docs += batch_docs
+    assert ids == collection.ids
+    # Rows without metadata stay None (Chroma rejects empty dicts)
+    assert metas == collection.metadatas
+    assert docs == collection.documents
+    assert "documents.bin" in manifest["files"]
+    atol = 0.02 if quantize else 0
+    np.testing.assert_allclose(np.concatenate(vectors), collection.embeddings, atol=atol)
+
+
+def test_checksum_mismatch_is_detected():
+    manifest = snapshots.export_collection(FakeCollection(), owner_id=1)
+    path = snapshots.snapshot_path(1, manifest["snapshot_id"])
+    with open(path / "ids.bin", "r+b") as f:
+        f.write(b"X")
+    with pytest.raises(snapshots.SnapshotError):
+        snapshots.open_snapshot(1, manifest["snapshot_id"])
+
+
+def test_empty_collection_and_bad_ids():
+    manifest = snapshots.export_collection(FakeCollection(n=0), owner_id=2, quantize=True)
+    snap = snapshots.open_snapshot(2, manifest["snapshot_id"])
+    assert len(snap) == 0 and list(snap.iter_batches(10)) == []
+
+    with pytest.raises(snapshots.SnapshotError):
+        snapshots.open_snapshot(2, "../1/whatever")
+
+
+def test_metadata_is_read_per_batch():
+    collection = FakeCollection(n=12)
+    manifest = snapshots.export_collection(collection, owner_id=4, batch_size=5)
+    snap = snapshots.open_snapshot(4, manifest["snapshot_id"])
+    assert isinstance(snap.metadata_offsets, np.memmap)
+    assert snap.metadatas(4, 6) == [{"page": 4}, {"page": 5}]
+    # A batch without any metadata restores as None
+    assert snap.metadatas(0, 1) is None
+
+
+def test_prune_removes_records_not_in_the_snapshot():
+    collection = FakeCollection(n=12)
+    manifest = snapshots.export_collection(collection, owner_id=5, batch_size=5)
+    snap = snapshots.open_snapshot(5, manifest["snapshot_id"])
+
+    # Records added after the snapshot was taken
+    live = FakeCollection(n=20)
+    live.ids = []
+    for i, record_id in enumerate(collection.ids):
+        live.ids.append(record_id)
+        if i % 3 == 0:
+            live.ids += [f"new-{i}", f"newer-{i}"]
+    removed = snapshots.prune_to_snapshot(live, snap, live.delete, batch_size=3)
+    assert removed == 8
+    assert live.ids == collection.ids
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models, semantic_cache, tasks, vector_store
+from database import Base
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(models.User(id=1, username="owner", hashed_password="x"))
+    db.add(models.KnowledgeBase(id=1, owner_id=1, name="kb"))
+    db.add(models.Document(id=7, owner_id=1, knowledge_base_id=1, filename="a.pdf"))
+    db.commit()
+    db.close()
+    monkeypatch.setattr(tasks, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def store(monkeypatch):
+    calls = {"upsert": [], "delete": [], "bumps": 0}
+
+    def upsert(owner_id, ids, embeddings, metadatas, documents):
+        calls["upsert"].append((ids, embeddings.shape, metadatas, documents))
+        return len(ids)
+
+    def bump(owner_id):
+        calls["bumps"] += 1
+
+    monkeypatch.setattr(vector_store, "embed_texts", lambda texts: np.zeros((len(texts), 3), dtype=np.float32))
+    monkeypatch.setattr(vector_store, "upsert", upsert)
+    monkeypatch.setattr(vector_store, "delete", lambda owner_id, ids: calls["delete"].append(ids))
+    monkeypatch.setattr(semantic_cache, "bump_tenant_version", bump)
+    monkeypatch.setattr(vector_store.vector_settings, "INGEST_BATCH_SIZE", 2)
+    return calls
+
+
+def ingest(monkeypatch, pages):
+    monkeypatch.setattr(tasks, "iter_pdf_pages", lambda path: iter(pages))
+    return tasks.process_document_task.run("a.pdf", 1, 7, max_tokens=8, overlap_tokens=0)
+
+
+def test_chunks_are_stored_and_upserted_in_batches(monkeypatch, session_factory, store):
+    result = ingest(monkeypatch, [" ".join(f"w{i}" for i in range(60))])
+
+    db = session_factory()
+    chunks = db.query(models.Chunk).order_by(models.Chunk.index).all()
+    document = db.get(models.Document, 7)
+    assert result["chunks"] == len(chunks) == document.chunk_count > 2
+    assert document.status == "ready"
+
+    ids = [i for batch in store["upsert"] for i in batch[0]]
+    assert ids == [f"doc7:{c.index}" for c in chunks]
+    assert all(len(batch[0]) <= 2 for batch in store["upsert"])
+    assert store["upsert"][0][3][0] == chunks[0].text
+    assert store["upsert"][0][2][0]["document_id"] == 7
+    assert store["bumps"] == 1
+
+
+def test_reingesting_replaces_chunks_and_drops_surplus_vectors(monkeypatch, session_factory, store):
+    first = ingest(monkeypatch, [" ".join(f"w{i}" for i in range(60))])["chunks"]
+    second = ingest(monkeypatch, ["short text"])["chunks"]
+
+    db = session_factory()
+    assert db.query(models.Chunk).count() == second == 1
+    assert store["delete"] == [[f"doc7:{i}" for i in range(1, first)]]
+
+
+def test_failure_marks_the_document(monkeypatch, session_factory, store):
+    def broken(path):
+        raise RuntimeError("corrupt pdf")
+        yield
+
+    monkeypatch.setattr(tasks, "iter_pdf_pages", broken)
+    with pytest.raises(RuntimeError):
+        tasks.process_document_task.run("a.pdf", 1, 7)
+    assert session_factory().get(models.Document, 7).status == "failed"
+
+
+def test_failed_reingest_keeps_the_previous_chunks(monkeypatch, session_factory, store):
+    first = ingest(monkeypatch, [" ".join(f"w{i}" for i in range(60))])["chunks"]
+
+    monkeypatch.setattr(vector_store, "embed_texts", lambda texts: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        ingest(monkeypatch, ["new text"])
+
+    db = session_factory()
+    assert db.query(models.Chunk).count() == first
+    assert db.get(models.Document, 7).status == "failed"
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import types
+
+import pytest
+from prometheus_client import REGISTRY
+from prometheus_client.openmetrics.exposition import generate_latest as generate_openmetrics
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import tracing
+from tracing import BatchExporter, FileExporter, TracingMiddleware, span, traced
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    target = ListExporter()
+    batch = BatchExporter(target, flush_interval=60)
+    monkeypatch.setattr(tracing, "_exporter", batch)
+
+    def collect():
+        batch.flush()
+        return {s.name: s for s in target.spans}
+    return collect
+
+
+def test_nested_spans_share_a_trace(exported):
+    with span("outer") as outer:
+        with span("inner", size=3) as inner:
+            assert tracing.current_span() is inner
+        assert tracing.current_span() is outer
+    assert tracing.current_span() is None
+
+    spans = exported()
+    assert spans["inner"].trace_id == spans["outer"].trace_id
+    assert spans["inner"].parent_id == spans["outer"].span_id
+    assert spans["outer"].parent_id is None
+    assert spans["inner"].attributes == {"size": 3}
+
+
+def test_errors_are_recorded_and_reraised(exported):
+    with pytest.raises(KeyError):
+        with span("failing"):
+            raise KeyError("x")
+    assert exported()["failing"].error == "KeyError"
+
+
+def test_traced_wraps_sync_and_async_functions(exported):
+    @traced("stage.sync")
+    def sync_work(x):
+        return x + 1
+
+    @traced()
+    async def async_work(x):
+        return x * 2
+
+    assert sync_work(1) == 2
+    assert asyncio.run(async_work(2)) == 4
+    spans = exported()
+    assert "stage.sync" in spans
+    assert "test_tracing.async_work" in spans
+
+
+def test_celery_headers_carry_the_trace_to_the_task(exported):
+    headers = {"id": "task-1"}
+    with span("http.request") as root:
+        tracing._on_before_task_publish(sender="import_vectors_task", headers=headers)
+        tracing._on_after_task_publish(sender="import_vectors_task", headers=headers)
+
+    # Worker side: Celery exposes custom message headers on task.request
+    task = types.SimpleNamespace(name="import_vectors_task", request=types.SimpleNamespace(**headers))
+    tracing._on_task_prerun(task_id="task-1", task=task)
+    with span("import.upsert_batch"):
+        pass
+    tracing._on_task_postrun(task_id="task-1", state="SUCCESS")
+
+    spans = exported()
+    publish, task_span = spans["celery.publish"], spans["task.import_vectors_task"]
+    assert publish.parent_id == root.span_id
+    assert task_span.trace_id == root.trace_id
+    assert task_span.parent_id == publish.span_id
+    assert spans["import.upsert_batch"].parent_id == task_span.span_id
+    assert tracing.current_span() is None
+
+
+def test_stage_histogram_carries_trace_id_exemplar(exported):
+    with span("exemplar.stage") as s:
+        pass
+    output = generate_openmetrics(REGISTRY).decode()
+    assert f'trace_id="{s.trace_id}"' in output
+
+
+def test_file_exporter_writes_jsonl(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    batch = BatchExporter(FileExporter(str(path)), flush_interval=60)
+    with span("a") as a:
+        pass
+    batch.submit(a)
+    batch.flush()
+    [line] = path.read_text().splitlines()
+    assert json.loads(line)["span_id"] == a.span_id
+
+
+def test_middleware_continues_incoming_trace(exported):
+    app = Starlette(routes=[Route("/work", lambda request: PlainTextResponse("ok"))])
+    app.add_middleware(TracingMiddleware)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    with TestClient(app) as client:
+        response = client.get("/work", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+    assert response.headers["x-trace-id"] == trace_id
+    root = exported()["http.request"]
+    assert root.parent_id == "00f067aa0ba902b7"
+    assert root.attributes["status"] == 200
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import monitoring
+import semantic_cache
+import vector_store
+from vector_store import CollectionCache
+
+
+class FakeCollection:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def upsert(self, **kwargs):
+        self.calls.append(("upsert", kwargs))
+
+    def delete(self, **kwargs):
+        self.calls.append(("delete", kwargs))
+
+    def query(self, **kwargs):
+        if self.fail:
+            raise RuntimeError("collection does not exist")
+        return {}
+
+
+class FakeClient:
+    max_batch_size = 4
+
+    def __init__(self):
+        self.lookups = 0
+        self.deleted = []
+        self.bumped = []
+        self.collections = {}
+
+    def get_or_create_collection(self, name, metadata=None):
+        self.lookups += 1
+        return self.collections.setdefault(name, FakeCollection())
+
+    def delete_collection(self, name):
+        self.deleted.append(name)
+        self.collections.pop(name, None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(vector_store, "get_client", lambda: fake)
+    monkeypatch.setattr(vector_store, "collection_cache", CollectionCache(max_size=2, ttl=60))
+    monkeypatch.setattr(semantic_cache, "bump_tenant_version", fake.bumped.append)
+    return fake
+
+
+def test_handles_are_cached_per_tenant(client):
+    first = vector_store.get_tenant_collection(1)
+    assert vector_store.get_tenant_collection(1) is first
+    assert client.lookups == 1
+
+
+def test_cache_evicts_least_recently_used(client):
+    vector_store.get_tenant_collection(1)
+    vector_store.get_tenant_collection(2)
+    vector_store.get_tenant_collection(1)
+    vector_store.get_tenant_collection(3)  # evicts tenant 2
+    assert client.lookups == 3
+    vector_store.get_tenant_collection(1)
+    assert client.lookups == 3
+    vector_store.get_tenant_collection(2)
+    assert client.lookups == 4
+
+
+def test_cache_entries_expire(client, monkeypatch):
+    vector_store.get_tenant_collection(1)
+    monkeypatch.setattr(vector_store.collection_cache, "ttl", 0)
+    vector_store.get_tenant_collection(1)
+    assert client.lookups == 2
+
+
+def test_delete_invalidates_the_handle(client):
+    vector_store.get_tenant_collection(1)
+    vector_store.delete_tenant_collection(1)
+    assert client.deleted == ["user_1"]
+    assert len(vector_store.collection_cache) == 0
+    assert client.bumped == [1]
+
+
+def test_failed_call_evicts_the_handle(client):
+    client.collections["user_1"] = FakeCollection(fail=True)
+    with pytest.raises(RuntimeError):
+        vector_store.get_tenant_collection(1).query(query_texts=["q"])
+    vector_store.get_tenant_collection(1)
+    assert client.lookups == 2
+
+
+def test_upsert_splits_batches_within_server_limit(client):
+    vectors = np.arange(20, dtype=np.float32).reshape(10, 2)
+    ids = [str(i) for i in range(10)]
+    written = vector_store.upsert(1, ids, vectors, [{"i": i} for i in range(10)], batch_size=100)
+
+    calls = client.collections["user_1"].calls
+    assert written == 10
+    assert [len(kwargs["ids"]) for _, kwargs in calls] == [4, 4, 2]
+    assert calls[2][1]["embeddings"] == [[16.0, 17.0], [18.0, 19.0]]
+    assert calls[2][1]["metadatas"] == [{"i": 8}, {"i": 9}]
+    assert "documents" not in calls[0][1]
+
+
+def test_delete_in_batches(client):
+    vector_store.delete(1, [str(i) for i in range(5)], batch_size=2)
+    calls = client.collections["user_1"].calls
+    assert [kwargs["ids"] for _, kwargs in calls] == [["0", "1"], ["2", "3"], ["4"]]
+    # Cached answers may quote the deleted documents
+    assert client.bumped == [1]
+
+
+def test_calls_are_counted_per_request(client):
+    calls = [0]
+    token = monitoring._vector_db_calls.set(calls)
+    try:
+        vector_store.upsert(1, ["a", "b"], np.zeros((2, 2), dtype=np.float32))
+        vector_store.get_tenant_collection(1).query(query_texts=["q"])
+    finally:
+        monitoring._vector_db_calls.reset(token)
+    # get_or_create_collection, upsert, query
+    assert calls[0] == 3